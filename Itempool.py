@@ -1,7 +1,145 @@
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+
 from Fill import FillError
 from worlds.AutoWorld import World
-from .Items import ITEM_TABLE, item_factory
-from BaseClasses import ItemClassification as IC, LocationProgressType
+from .Items import ITEM_TABLE, PersistentQuantities, item_factory
+from .Locations import layout_location_count, location_layout
+from .Regions import layout_key
+from .options import StartingAbility
+from BaseClasses import ItemClassification as IC
+
+# how many distinct item pools are kept around, like the region and location layouts
+POOL_CACHE_SIZE = 64
+
+# Captain's upgrades added when captains_upgrades is on
+UPGRADE_QUANTITIES: dict[str, int] = {
+    "Max Health Upgrade": 4,
+    "Max Lives Upgrade": 1,
+    "Max Energy Upgrade": 4,
+    "Item Rarity Upgrade": 6,
+    "Sparks in Fragments Upgrade": 3,
+    "Starting Sparks Upgrade": 3,
+}
+
+# the starting_ability choice that removes each ability from the pool
+STARTING_ABILITY_CHOICES: dict[str, int] = {
+    "Courier's Board": StartingAbility.option_couriers_board,
+    "Sage's Cowl": StartingAbility.option_sages_cowl,
+    "Heir's Javelin": StartingAbility.option_heirs_javelin,
+    "Wraith's Hourglass": StartingAbility.option_wraiths_hourglass,
+}
+
+# Persistent items and their permanent_item_quantities key
+PERM_ITEM_KEYS: dict[str, str] = {
+    "Persistent Common Speed Item": "common_speed",
+    "Persistent Common Support Item": "common_support",
+    "Persistent Common Health Item": "common_health",
+    "Persistent Rare Speed Item": "rare_speed",
+    "Persistent Rare Support Item": "rare_support",
+    "Persistent Rare Health Item": "rare_health",
+    "Persistent Epic Speed Item": "epic_speed",
+    "Persistent Epic Support Item": "epic_support",
+    "Persistent Epic Health Item": "epic_health",
+    "Persistent Legendary Item": "legendary",
+}
+
+
+class HastePoolKey(NamedTuple):
+    """
+    The options that decide how many of each item go in the pool, used to share quantity tables between slots.
+
+    Options that don't matter with their parent option off are normalised away, eg. perm_quantities is all 0 without
+    persistent items.
+    """
+
+    shard_items: int
+    npc_shuffle: bool
+    captains_upgrades: bool
+    weeboh_purchases: bool
+    speed_upgrade: bool
+    starting_ability: int
+    perm_quantities: PersistentQuantities
+
+
+def pool_key(world: "World") -> HastePoolKey:
+    options = world.options
+    if options.remove_post_victory_locations:
+        shard_items = max(options.shard_goal - 1 + options.extra_shard_items, 1)
+    else:
+        shard_items = 9 + options.extra_shard_items
+    perm_quantities = world.perm_quantities if options.permanent_items > 0 else PersistentQuantities()
+    return HastePoolKey(
+        shard_items=shard_items,
+        npc_shuffle=options.npc_shuffle == 1,
+        captains_upgrades=options.captains_upgrades == 1,
+        weeboh_purchases=options.weeboh_purchases == 1,
+        speed_upgrade=options.speed_upgrade == 1,
+        starting_ability=options.starting_ability.value,
+        perm_quantities=perm_quantities,
+    )
+
+
+@lru_cache(maxsize=POOL_CACHE_SIZE)
+def item_quantity_table(key: HastePoolKey) -> dict[str, tuple[int, IC]]:
+    """
+    How many of each item go in the pool and with which classification, in ITEM_TABLE order.
+
+    Items with no copies are left out. Cached per HastePoolKey (see item_quantity_table.cache_info()).
+    """
+    perm_quantities = {item: getattr(key.perm_quantities, field) for item, field in PERM_ITEM_KEYS.items()}
+    table: dict[str, tuple[int, IC]] = {}
+
+    for item, data in ITEM_TABLE.items():
+        assert isinstance(data.code, int), f"{item=} does not have a code"
+        classification = data.classification
+
+        additional_items = 0
+        if data.type == "Shard":
+            additional_items = key.shard_items
+        elif data.type == "NPC" and key.npc_shuffle:
+            # add NPCs into the pool
+            additional_items = 1
+            if not key.captains_upgrades and item == "The Captain":
+                # make Captain non-progression if he doesnt have checks
+                classification = IC.useful
+            if not key.weeboh_purchases and item == "Fashion Weeboh":
+                # make Fashion Weeboh non-progression if they dont have checks
+                classification = IC.filler
+        elif data.type == "Speed" and key.speed_upgrade:
+            # add 6 speed upgrades into the pool
+            additional_items = 6
+        elif data.type == "Upgrade" and key.captains_upgrades:
+            additional_items = UPGRADE_QUANTITIES.get(item, 0)
+        elif data.type == "Ability":
+            # remove the ability you start with but keep the rest
+            if key.starting_ability == STARTING_ABILITY_CHOICES.get(item):
+                additional_items = -1
+        elif data.type == "PermItem":
+            additional_items = perm_quantities.get(item, 0)
+
+        if data.quantity + additional_items > 0:
+            table[item] = (data.quantity + additional_items, classification)
+
+    return table
+
+
+def build_item_pools(key: HastePoolKey) -> tuple[list[str], list[str], list[str]]:
+    """Expand the quantity table into fresh progression, useful and filler pools in one pass."""
+    progression_pool: list[str] = []
+    useful_pool: list[str] = []
+    filler_pool: list[str] = []
+
+    for item, (quantity, classification) in item_quantity_table(key).items():
+        if classification & IC.progression:
+            progression_pool += [item] * quantity
+        elif classification & IC.useful:
+            useful_pool += [item] * quantity
+        else:
+            filler_pool += [item] * quantity
+
+    return progression_pool, useful_pool, filler_pool
 
 
 def generate_itempool(world: "World") -> None:
@@ -21,121 +159,134 @@ def generate_itempool(world: "World") -> None:
     multiworld.itempool.extend(items)
 
 
-def get_pool_core(world: "World") -> tuple[list[str], list[str]]:
-    pool: list[str] = []
-    precollected_items: list[str] = []
+@lru_cache(maxsize=POOL_CACHE_SIZE)
+def pool_counts(key: HastePoolKey) -> tuple[int, int, int]:
+    """How many progression, useful and filler items build_item_pools makes for a key, without building them."""
+    counts = [0, 0, 0]
+    for quantity, classification in item_quantity_table(key).values():
+        if classification & IC.progression:
+            counts[0] += quantity
+        elif classification & IC.useful:
+            counts[1] += quantity
+        else:
+            counts[2] += quantity
+    return counts[0], counts[1], counts[2]
 
-    progression_pool: list[str] = []
-    useful_pool: list[str] = []
-    filler_pool: list[str] = []
-    prefill_pool: list[str] = []
 
-    for item, data in ITEM_TABLE.items():
-        if isinstance(data.code, int):
-            adjusted_classification = world.determine_item_classification(item)
-            classification = (
-                data.classification
-                if adjusted_classification is None
-                else adjusted_classification
+class HasteCapacity(NamedTuple):
+    """
+    How many items a world will have to place and how many locations it will have for them.
+
+    Worked out from the cached location layout and item quantity table, so it can be checked before anything is created.
+
+    :param locations: Locations left for the pool once the goal item is locked in.
+    :param excluded: How many of those locations are excluded, they can only take random filler.
+    :param progression: Progression items in the pool.
+    :param useful: Useful items in the pool, they are placed before any random filler.
+    :param filler: Fixed filler items, placed after the useful items if there is room.
+    """
+
+    locations: int
+    excluded: int
+    progression: int
+    useful: int
+    filler: int
+
+    @property
+    def required(self) -> int:
+        return self.progression + self.useful
+
+
+def pool_capacity(world: "World") -> HasteCapacity:
+    progression, useful, filler = pool_counts(pool_key(world))
+    # the goal boss location is always part of the layout and gets A New Future locked in
+    key = layout_key(world.options)
+    locations = layout_location_count(key) - 1
+    excluded = 0
+    if world.nonprogress_locations:
+        excluded = sum(1 for location in location_layout(key) if location.name in world.nonprogress_locations)
+    return HasteCapacity(locations, excluded, progression, useful, filler)
+
+
+# Progression that would take up at least this share of the locations able to hold it makes a slot restrictive enough
+# to place the goal's Shard gating items in pre_fill, rather than leaving them to swap around in the main fill.
+# Those items then always end up in the slot's own locations, as the ShardGoal option description says.
+PREFILL_PROGRESSION_RATIO = 0.5
+
+# pre_fill places its items into at most this many of the slot's earliest locations per item
+PREFILL_CANDIDATES_PER_ITEM = 3
+
+
+def prefill_item_names(world: "World", progression_pool: list[str]) -> list[str]:
+    """
+    The items pre_fill places for restrictive slots: everything the goal Shard's entrance needs (Progressive Shards,
+    speed upgrades and an ability when there's no starting one), straight from the rule table.
+
+    Returns nothing for slots with plenty of room, which are left to the main fill.
+    """
+    capacity: HasteCapacity = world.haste_capacity
+    progression_locations = capacity.locations - capacity.excluded
+    if capacity.progression < progression_locations * PREFILL_PROGRESSION_RATIO:
+        return []
+
+    requirement = world.haste_rules.shard_requirement(world.options.shard_goal.value)
+    names: list[str] = []
+    for item, count in requirement.counts:
+        names += [item] * min(count, progression_pool.count(item))
+    abilities = [item for item in requirement.any_of if item in progression_pool]
+    if abilities:
+        names.append(world.random.choice(abilities))
+    return names
+
+
+def prefill_candidate_names(world: "World", items: list[str]) -> list[str]:
+    """
+    The bounded set of early locations pre_fill places its items into.
+
+    Only empty, non-excluded locations the pre-filled items reach on their own qualify, so nothing outside them (eg. an
+    NPC) can gate a Shard. They are taken least demanding first, in random order within each tier, up to
+    PREFILL_CANDIDATES_PER_ITEM per item, and returned most demanding first: fill_restrictive takes the first location
+    that fits, so each item then goes as deep as the items still to place allow, keeping the easy ones for the last.
+    """
+    # only restrictive slots get here, so the reachability tables aren't imported with the package
+    from .reachability import HasteReachability
+    held = Counter(items)
+    tiers: dict[int, list[str]] = {}
+    for threshold, names in HasteReachability.for_world(world).groups:
+        if threshold.met_by(held):
+            tiers.setdefault(threshold.size, []).extend(
+                name for name in names
+                if name not in world.nonprogress_locations and world.haste_locations[name].item is None
             )
 
-            # the more rules I add to this, the more I think it could probably be formatted better
-            # especially since most items in the table have a base quantity of 0 at this point and it doesn't make sense in this format anymore
-
-            additional_items = 0
-            if data.type == "Shard":
-                if world.options.remove_post_victory_locations:
-                    additional_items = max(world.options.shard_goal - 1 + world.options.extra_shard_items, 1)
-                else:
-                    additional_items = 9 + world.options.extra_shard_items
-            elif data.type == "NPC" and world.options.npc_shuffle == 1:
-                # add NPCs into the pool
-                additional_items = 1
-                if world.options.captains_upgrades != 1 and item == "The Captain":
-                    # make Captain non-progression if he doesnt have checks
-                    classification = IC.useful
-                if world.options.weeboh_purchases != 1 and item == "Fashion Weeboh":
-                    # make Fashion Weeboh non-progression if they dont have checks
-                    classification = IC.filler
-            elif data.type == "Speed" and world.options.speed_upgrade == 1:
-                # add 6 speed upgrades into the pool
-                additional_items = 6
-            elif data.type == "Upgrade" and world.options.captains_upgrades == 1:
-                match item:
-                    case "Max Health Upgrade":
-                        additional_items = 4
-                    case "Max Lives Upgrade":
-                        additional_items = 1
-                    case "Max Energy Upgrade":
-                        additional_items = 4
-                    case "Item Rarity Upgrade":
-                        additional_items = 6
-                    case "Sparks in Fragments Upgrade":
-                        additional_items = 3
-                    case "Starting Sparks Upgrade":
-                        additional_items = 3
-            elif data.type == "Ability":
-                # remove the ability you start with but keep the rest
-                match item:
-                    case "Courier's Board":
-                        if (world.options.starting_ability == 1): additional_items = -1
-                    case "Sage's Cowl":
-                        if (world.options.starting_ability == 2): additional_items = -1
-                    case "Heir's Javelin":
-                        if (world.options.starting_ability == 3): additional_items = -1
-                    case "Wraith's Hourglass":
-                        if (world.options.starting_ability == 4): additional_items = -1
-            elif data.type == "PermItem" and world.options.permanent_items > 0:
-                match item:
-                    case "Persistent Common Speed Item":
-                        additional_items = world.perm_item_dict["common_speed"]
-                    case "Persistent Common Support Item":
-                        additional_items = world.perm_item_dict["common_support"]
-                    case "Persistent Common Health Item":
-                        additional_items = world.perm_item_dict["common_health"]
-                    case "Persistent Rare Speed Item":
-                        additional_items = world.perm_item_dict["rare_speed"]
-                    case "Persistent Rare Support Item":
-                        additional_items = world.perm_item_dict["rare_support"]
-                    case "Persistent Rare Health Item":
-                        additional_items = world.perm_item_dict["rare_health"]
-                    case "Persistent Epic Speed Item":
-                        additional_items = world.perm_item_dict["epic_speed"]
-                    case "Persistent Epic Support Item":
-                        additional_items = world.perm_item_dict["epic_support"]
-                    case "Persistent Epic Health Item":
-                        additional_items = world.perm_item_dict["epic_health"]
-                    case "Persistent Legendary Item":
-                        additional_items = world.perm_item_dict["legendary"]
-            
-
-            if (data.quantity + additional_items <= 0): continue
-
-            if classification & IC.progression:
-                progression_pool.extend([item] * (data.quantity + additional_items))
-            elif classification & IC.useful:
-                useful_pool.extend([item] * (data.quantity + additional_items))
-            else:
-                filler_pool.extend([item] * (data.quantity + additional_items))
-        else:
-            assert False, f"{item=} does not have a code"
+    candidates: list[str] = []
+    for size in sorted(tiers):
+        names = tiers[size]
+        world.random.shuffle(names)
+        candidates += names
+    candidates = candidates[:len(items) * PREFILL_CANDIDATES_PER_ITEM]
+    candidates.reverse()
+    return candidates
+
+
+def get_pool_core(world: "World") -> tuple[list[str], list[str]]:
+    pool: list[str] = []
+    precollected_items: list[str] = []
+
+    progression_pool, useful_pool, filler_pool = build_item_pools(pool_key(world))
 
-    placeable_locations = [
-        location
-        for location in world.multiworld.get_locations(world.player)
-        if location.address is not None and location.item is None
-    ]
+    prefill_pool = prefill_item_names(world, progression_pool)
+    for item in prefill_pool:
+        progression_pool.remove(item)
 
-    num_items_left_to_place = len(placeable_locations) - len(prefill_pool)
+    # the world keeps its location counts up to date, so there's no need to walk the multiworld's locations
+    location_counts = world.location_counts
+    assert location_counts.placeable == world.haste_capacity.locations, f"{location_counts=}, {world.haste_capacity=}"
+    assert location_counts.excluded == world.haste_capacity.excluded, f"{location_counts=}, {world.haste_capacity=}"
+    num_items_left_to_place = location_counts.placeable - len(prefill_pool)
 
     # Check progression pool against locations that can hold progression items
-    if len(progression_pool) > len(
-        [
-            location
-            for location in placeable_locations
-            if location.progress_type != LocationProgressType.EXCLUDED
-        ]
-    ):
+    if len(progression_pool) + len(prefill_pool) > location_counts.progression_capacity:
         raise FillError(
             "There are insufficient locations to place progression items! "
             f"Trying to place {len(progression_pool)} items in only {num_items_left_to_place} locations."
@@ -155,7 +306,7 @@ def get_pool_core(world: "World") -> tuple[list[str], list[str]]:
     # assert len(world.filler_pool) > 0
 
     # Place filler items ensure that the pool has the correct number of items.
-    pool.extend([world.get_filler_item_name() for _ in range(num_items_left_to_place)])
+    pool.extend(world.get_filler_item_names(num_items_left_to_place))
     # pool.extend(filler_pool)
 
     return pool, precollected_items
@@ -1,4 +1,5 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
 from typing import TYPE_CHECKING, NamedTuple, Optional, Union, Any
 from random import Random
 
@@ -34,6 +35,8 @@ class HasteItem(Item):
     :param classification: Optional classification to override the default.
     """
 
+    __slots__ = ("type",)
+
     game: str = "Haste"
     type: Optional[str]
 
@@ -53,6 +56,16 @@ class HasteItem(Item):
         # self.dungeon = dungeon
         self.type = data.type
 
+    @classmethod
+    def from_resolved(
+        cls, name: str, player: int, classification: IC, address: Optional[int], item_type: str
+    ) -> "HasteItem":
+        """Create an item from already looked up data, without going back to the item table."""
+        item = cls.__new__(cls)
+        Item.__init__(item, name, classification, address, player)
+        item.type = item_type
+        return item
+
     @staticmethod
     def get_apid(code: int) -> int:
         """
@@ -77,20 +90,29 @@ def item_factory(
     :raises KeyError: If an unknown item name is provided.
     :return: A single item or a list of items.
     """
-    if not items:
-        pass
-    ret: list[HasteItem] = []
-    singleton = False
     if isinstance(items, str):
-        items = [items]
-        singleton = True
+        if items not in ITEM_TABLE:
+            raise KeyError(f"Unknown item {items=}")
+        return world.create_item(items)
+
+    # pools repeat the same few names a lot, so look each one up once and stamp out the copies
+    resolved: dict[str, tuple[IC, Optional[int], str]] = {}
+    ret: list[HasteItem] = []
     for item in items:
-        if item in ITEM_TABLE:
-            ret.append(world.create_item(item))
-        else:
-            raise KeyError(f"Unknown item {item=}, {items=}")
+        entry = resolved.get(item)
+        if entry is None:
+            if item not in ITEM_TABLE:
+                raise KeyError(f"Unknown item {item=}, {items=}")
+            data = ITEM_TABLE[item]
+            classification = world.determine_item_classification(item)
+            entry = resolved[item] = (
+                data.classification if classification is None else classification,
+                None if data.code is None else HasteItem.get_apid(data.code),
+                data.type,
+            )
+        ret.append(HasteItem.from_resolved(item, world.player, *entry))
 
-    return ret[0] if singleton else ret
+    return ret
 
 def parse_perm_quantity(option_value: str, random: Random) -> int:
     """Calculates bound of value for Persistent Item."""
@@ -109,6 +131,107 @@ def parse_perm_quantity(option_value: str, random: Random) -> int:
         return random.randrange(lower_bound, upper_bound)
 
 
+class PersistentQuantities(NamedTuple):
+    """How many of each Persistent Item a world puts in its pool, keyed like the permanent_item_quantities option."""
+
+    common_speed: int = 0
+    common_support: int = 0
+    common_health: int = 0
+    rare_speed: int = 0
+    rare_support: int = 0
+    rare_health: int = 0
+    epic_speed: int = 0
+    epic_support: int = 0
+    epic_health: int = 0
+    legendary: int = 0
+
+
+def parse_perm_quantities(option_value: Mapping[str, Union[int, str]], random: Random) -> PersistentQuantities:
+    """Roll every Persistent Item quantity in the option, keys that aren't given are 0."""
+    # parsed in option order, so the rolls use the world's random the same way they always have
+    return PersistentQuantities(**{key: parse_perm_quantity(value, random) for key, value in option_value.items()})
+
+
+ANTISPARK_BUNDLES = (
+    "Anti-Spark 10 bundle",
+    "Anti-Spark 100 bundle",
+    "Anti-Spark 250 bundle",
+    "Anti-Spark 500 bundle",
+    "Anti-Spark 750 bundle",
+    "Anti-Spark 1k bundle",
+)
+
+# Anti-Spark bundle weights for each antispark_filler choice, in ANTISPARK_BUNDLES order
+ANTISPARK_FILLER_WEIGHTS: dict[int, tuple[int, ...]] = {
+    0: (35, 20, 2, 2, 1, 1),
+    1: (15, 10, 5, 2, 2, 1),
+    2: (10, 5, 5, 2, 2, 2),
+    3: (5, 5, 5, 3, 3, 3),
+}
+
+
+class FillerSampler:
+    """
+    Draws filler item names from a fixed weighted distribution in O(1) per item, using Vose's alias method.
+
+    :param names: The items to draw from.
+    :param weights: The relative weight of each item, at least one has to be positive.
+    """
+
+    __slots__ = ("names", "probabilities", "aliases")
+
+    def __init__(self, names: tuple[str, ...], weights: tuple[int, ...]) -> None:
+        assert len(names) == len(weights), f"{len(names)=}, {len(weights)=}"
+        total = sum(weights)
+        assert total > 0, "filler weights must not all be 0"
+        size = len(names)
+        scaled = [weight * size / total for weight in weights]
+        probabilities = [1.0] * size
+        aliases = list(range(size))
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # whatever is left over is 1 up to float error and keeps its own column
+
+        self.names = names
+        self.probabilities = tuple(probabilities)
+        self.aliases = tuple(aliases)
+
+    def sample(self, random: Random, count: int) -> list[str]:
+        names, probabilities, aliases = self.names, self.probabilities, self.aliases
+        size = len(names)
+        draw = random.random
+        result: list[str] = []
+        for _ in range(count):
+            column, remainder = divmod(draw() * size, 1)
+            column = int(column)
+            result.append(names[column] if remainder < probabilities[column] else names[aliases[column]])
+        return result
+
+
+@lru_cache(maxsize=None)
+def filler_sampler(disaster_trap_weight: int, landing_trap_weight: int, antispark_filler: int) -> FillerSampler:
+    """
+    The filler distribution for a set of trap and Anti-Spark options, shared by every slot using them.
+
+    Sparks are the default filler at 100% filler and each trap weight subtracts from it, the Anti-Spark share is then
+    split between bundles by the antispark_filler weights.
+    """
+    spark_weight = max(0, 100 - disaster_trap_weight - landing_trap_weight)
+    bundle_weights = ANTISPARK_FILLER_WEIGHTS.get(antispark_filler, ANTISPARK_FILLER_WEIGHTS[3])
+    bundle_total = sum(bundle_weights)
+    return FillerSampler(
+        ("Disaster Trap", "Landing Downgrade Trap") + ANTISPARK_BUNDLES,
+        (disaster_trap_weight * bundle_total, landing_trap_weight * bundle_total)
+        + tuple(spark_weight * weight for weight in bundle_weights),
+    )
+
+
 VERY_USEFUL = IC.progression | IC.useful
 ITEM_TABLE: dict[str, HasteItemData] = {
     "A New Future": HasteItemData("Victory", IC.progression, 0, 0),
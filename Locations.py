@@ -1,10 +1,13 @@
+from array import array
 from enum import Flag, auto
+from functools import cache, lru_cache
+from itertools import accumulate
 from typing import NamedTuple, Optional
-from BaseClasses import Location, Region, ItemClassification
+from BaseClasses import Location, LocationProgressType, Region, ItemClassification
 from math import floor
 
 from .Items import HasteItem, HasteItemData
-from .Regions import SHOP_SEGMENTING, FRAGMENT_SEGMENTING
+from .Regions import FRAGMENT_SEGMENTING, LAYOUT_CACHE_SIZE, SHOP_SEGMENTING, HasteLayoutKey, layout_key
 
 class HasteFlag(Flag):
     # Define flag types for different categories of checks
@@ -24,6 +27,7 @@ class HasteLocationData(NamedTuple):
     flags: HasteFlag
     shard: Optional[int] = None
     skin: Optional[int] = None
+    ordinal: Optional[int] = None
 
 
 class HasteLocation(Location):
@@ -44,6 +48,47 @@ class HasteLocation(Location):
         return base_id + code
 
 
+class HasteLocationCounts:
+    """
+    Running counts of a world's locations, kept up to date as they are created and filled.
+
+    This lets the item pool be sized without walking every location in the multiworld.
+
+    :param placeable: Locations with an address that are still empty.
+    :param excluded: How many of the placeable locations are excluded from holding progression.
+    :param events: Event locations, which never take a pool item.
+    """
+
+    __slots__ = ("placeable", "excluded", "events")
+
+    def __init__(self) -> None:
+        self.placeable = 0
+        self.excluded = 0
+        self.events = 0
+
+    def add(self, location: Location) -> None:
+        if location.address is None:
+            self.events += 1
+        elif location.item is None:
+            self.placeable += 1
+            if location.progress_type == LocationProgressType.EXCLUDED:
+                self.excluded += 1
+
+    def lock(self, location: Location) -> None:
+        """Record that a counted empty location has had an item locked into it."""
+        assert location.address is not None
+        self.placeable -= 1
+        if location.progress_type == LocationProgressType.EXCLUDED:
+            self.excluded -= 1
+
+    @property
+    def progression_capacity(self) -> int:
+        return self.placeable - self.excluded
+
+    def __repr__(self) -> str:
+        return f"HasteLocationCounts(placeable={self.placeable}, excluded={self.excluded}, events={self.events})"
+
+
 LOCATION_TABLE = {
     "Wraith's Hourglass Purchase": HasteLocationData(code=1, flags=HasteFlag.Always),
     "Heir's Javelin Purchase": HasteLocationData(code=2, flags=HasteFlag.Always),
@@ -95,11 +140,14 @@ LOCATION_TABLE["Costume Purchase: Twisted Flopsy"] = HasteLocationData(code=49,
 LOCATION_TABLE["Costume Purchase: Weeboh"] = HasteLocationData(code=50, flags=HasteFlag.Fashion, skin=10)
 LOCATION_TABLE["Costume Purchase: Zoe 64"] = HasteLocationData(code=51, flags=HasteFlag.Fashion, skin=64)
 
+# Costumes that unlock with a Shard under vanilla fashion unlocks (skin: shard), their locations piggyback that Shard's region
+COSTUME_SHARDS = {10: 5, 6: 7}
+
 # global shop locations
 # IDs 101-200
 for j in range(1, 101):
     LOCATION_TABLE[f"Global Shop Item {j:03}"] = HasteLocationData(
-        code=100 + j, flags=HasteFlag.GlobalShop, shard=1
+        code=100 + j, flags=HasteFlag.GlobalShop, shard=1, ordinal=j
     )
 
 # per-shard shop locations
@@ -107,14 +155,14 @@ for j in range(1, 101):
 for i in range(1,11):
     for j in range(1, 26):
         LOCATION_TABLE[f"Shard {i} Shop Item {j:02}"] = HasteLocationData(
-            code=200 + (i-1)*25 + j, flags=HasteFlag.PerShardShop, shard=i
+            code=200 + (i-1)*25 + j, flags=HasteFlag.PerShardShop, shard=i, ordinal=j
         )
 
 # global fragment locations
 # IDs 451-500
 for j in range(1, 51):
     LOCATION_TABLE[f"Global Fragment Clear {j:02}"] = HasteLocationData(
-        code=450 + j, flags=HasteFlag.GlobalFragment, shard=1
+        code=450 + j, flags=HasteFlag.GlobalFragment, shard=1, ordinal=j
     )
 
 # per-shard shop locations
@@ -122,111 +170,283 @@ for j in range(1, 51):
 for i in range(1,11):
     for j in range(1, 26):
         LOCATION_TABLE[f"Shard {i} Fragment Clear {j:02}"] = HasteLocationData(
-            code=500 + (i-1)*25 + j, flags=HasteFlag.PerShardFragment, shard=i
+            code=500 + (i-1)*25 + j, flags=HasteFlag.PerShardFragment, shard=i, ordinal=j
         )
 
-def none_or_within_shard(goal, rpvl, shard) -> bool:
-    if shard is None: return True
-    if rpvl:
-        return (shard <= goal)
-    return True
 
-def create_locations(world, regions):
+class HasteLocationCatalog:
+    """
+    Array-backed view of LOCATION_TABLE, every array is indexed by location code.
+
+    Holds parallel arrays of flag bits, shard and ordinal so an Archipelago location id can be mapped back to its
+    metadata by arithmetic rather than by parsing the location name. A shard or ordinal of 0 means the location has
+    none, and a flag of 0 means no location has that code. Names aren't kept, World.location_id_to_name has them.
+    """
 
+    __slots__ = ("flag_bits", "shards", "ordinals")
 
+    def __init__(self, table: dict[str, HasteLocationData]):
+        size = max(data.code for data in table.values()) + 1
+
+        self.flag_bits = array("H", bytes(2 * size))
+        self.shards = array("B", bytes(size))
+        self.ordinals = array("B", bytes(size))
+
+        for data in table.values():
+            self.flag_bits[data.code] = data.flags.value
+            self.shards[data.code] = data.shard or 0
+            self.ordinals[data.code] = data.ordinal or 0
+
+    @staticmethod
+    def code_of(location_id: int) -> int:
+        return location_id - HasteLocation.get_apid(0)
+
+    def flag(self, location_id: int) -> HasteFlag:
+        return HasteFlag(self.flag_bits[self.code_of(location_id)])
+
+    def shard(self, location_id: int) -> Optional[int]:
+        return self.shards[self.code_of(location_id)] or None
+
+    def ordinal(self, location_id: int) -> Optional[int]:
+        return self.ordinals[self.code_of(location_id)] or None
+
+    def hint_text(self, location_id: int, fragment_thresholds: tuple[int, ...] = ()) -> Optional[str]:
+        """
+        Extra hint text saying how many Fragment clears a fragment check needs, eg. "after 20 Fragment clears".
+
+        Only fragment checks fragment_thresholds covers get any, every other location's name already says where it is.
+        """
+        code = self.code_of(location_id)
+        if self.flag_bits[code] not in (HasteFlag.PerShardFragment.value, HasteFlag.GlobalFragment.value):
+            return None
+        ordinal = self.ordinals[code]
+        if ordinal > len(fragment_thresholds):
+            return None
+        return f"after {fragment_thresholds[ordinal - 1]} Fragment clears"
+
+@cache
+def get_location_catalog() -> HasteLocationCatalog:
+    """Build the location catalog on first use, it is only needed once a Haste slot fills in its hint information."""
+    return HasteLocationCatalog(LOCATION_TABLE)
+
+# Location plan: LOCATION_TABLE indexed by flag, then shard, with each bucket ordered by ordinal.
+# Shop and fragment buckets are sorted so that an option quantity of N is the first N entries of the bucket,
+# which lets create_locations only visit the locations the options actually enable.
+LocationPlanEntry = tuple[str, HasteLocationData]
+
+@cache
+def get_location_plan() -> dict[HasteFlag, dict[Optional[int], tuple[LocationPlanEntry, ...]]]:
+    """Build the location plan on first use, it is only needed once a Haste slot creates its locations."""
+    plan: dict[HasteFlag, dict[Optional[int], list[LocationPlanEntry]]] = {}
     for location_name, data in LOCATION_TABLE.items():
-        if none_or_within_shard(world.options.shard_goal, world.options.remove_post_victory_locations, data.shard):
-            if data.flags == HasteFlag.Always or (data.flags == HasteFlag.CaptainsUpgrade and world.options.captains_upgrades == 1):
-                location = HasteLocation(world.player, location_name, regions["Menu"], data)
-                regions["Menu"].locations.append(location)
-            
-            # if data.flags == HasteFlag.Fashion and world.options.weeboh_purchases >= 1 and world.options.default_outfit_body != data.skin and world.options.default_outfit_hat != data.skin:
-            if data.flags == HasteFlag.Fashion and world.options.weeboh_purchases >= 1:
-                location = HasteLocation(world.player, location_name, regions["Menu"], data)
-                # Crispy and Twisted Flopsy are unobtainable in the scope of AP with vanilla fashion unlocks
-                if world.options.weeboh_purchases == 1:
-                    if (data.skin == 1 or data.skin == 7 or data.skin == 2 or data.skin == 3):
-                        continue
-                if world.options.weeboh_purchases == 1 or world.options.weeboh_purchases == 2:
-                    if data.skin == 10:
-                        # adding Weeboh to Shard 5 to piggyback speed calcs, but if Shard 5 doesn't exist, then don't add it
-                        if (not world.options.remove_post_victory_locations or world.options.shard_goal >= 5): location = HasteLocation(world.player, location_name, regions["Shard 5"], data)
-                        else: continue
-                    elif data.skin == 6:
-                        # adding Flopsy to Shard 7 to piggyback speed calcs, but if Shard 7 doesn't exist, then don't add it
-                        if (not world.options.remove_post_victory_locations or world.options.shard_goal >= 7): location = HasteLocation(world.player, location_name, regions["Shard 7"], data)
-                        else: continue
-                regions["Menu"].locations.append(location)
-
-            if data.flags == HasteFlag.Boss:
-                location = HasteLocation(world.player, location_name, regions[f"Shard {data.shard}"], data)
-                regions[f"Shard {data.shard}"].locations.append(location)
-
-            if (data.flags == HasteFlag.PerShardShop and world.options.shopsanity == 1) or (data.flags == HasteFlag.GlobalShop and world.options.shopsanity == 2):
-                if data.flags == HasteFlag.PerShardShop:
-                    shardnum = data.shard
-                else:
-                    shardnum = 1
-                shopnum = int(location_name.split()[-1])
-                shoplim = world.options.pershard_shopsanity_quantity if data.flags == HasteFlag.PerShardShop else world.options.global_shopsanity_quantity
-                if shopnum <= shoplim:
-                    #print(f"shopnum = {shopnum}")
-                    # the real item location
-                    if shopnum >SHOP_SEGMENTING:
-                        regionnum = floor((shopnum-1)/SHOP_SEGMENTING)
-                        location = HasteLocation(world.player, location_name, regions[f"Shard {shardnum} Shop {regionnum}"], data)
-                        regions[f"Shard {shardnum} Shop {regionnum}"].locations.append(location)
-                    else:
-                        location = HasteLocation(world.player, location_name, regions[f"Shard {shardnum}"], data)
-                        regions[f"Shard {shardnum}"].locations.append(location)
-                    # the event item location
-                    if shopnum % SHOP_SEGMENTING == 0:
-                        regionnum = floor((shopnum-1)/SHOP_SEGMENTING)
-                        if shopnum == SHOP_SEGMENTING:
-                            regionname = f"Shard {shardnum}"
-                        else:
-                            regionname = f"Shard {shardnum} Shop {regionnum}"
-                        location = HasteLocation(world.player, f"Shard{shardnum}Shop{regionnum}Event", regions[regionname], None)
-                        location.place_locked_item(HasteItem(
-                            f"Shard{shardnum}ShopRegion{regionnum+1}Unlock",
-                            world.player,
-                            HasteItemData(f"you cant see me", ItemClassification.progression, None, 1),
-                            ItemClassification.progression,
-                        ))
-                        regions[regionname].locations.append(location)
-
-            if (data.flags == HasteFlag.PerShardFragment and world.options.fragmentsanity == 1) or (data.flags == HasteFlag.GlobalFragment and world.options.fragmentsanity == 2):
-                if data.flags == HasteFlag.PerShardFragment:
-                    shardnum = data.shard
+        plan.setdefault(data.flags, {}).setdefault(data.shard, []).append((location_name, data))
+    return {
+        flag: {
+            shard: tuple(sorted(entries, key=lambda entry: entry[1].ordinal or 0))
+            for shard, entries in shards.items()
+        }
+        for flag, shards in plan.items()
+    }
+
+def build_location_name_groups() -> dict[str, set[str]]:
+    """
+    Build every location name group in a single pass over LOCATION_TABLE.
+
+    Locations are classified by their flag and shard rather than by name prefix.
+    """
+    groups: dict[str, set[str]] = {}
+
+    def add(group: str, location_name: str) -> None:
+        groups.setdefault(group, set()).add(location_name)
+
+    for location_name, data in LOCATION_TABLE.items():
+        flags = data.flags
+        if flags == HasteFlag.Always:
+            add("Ability Purchases", location_name)
+        elif flags == HasteFlag.Boss:
+            add(f"Shard {data.shard}", location_name)
+            add("Shard Bosses", location_name)
+        elif flags == HasteFlag.CaptainsUpgrade:
+            add("Captain's Purchases", location_name)
+        elif flags == HasteFlag.Fashion:
+            add("Costume Purchases", location_name)
+            if data.skin in COSTUME_SHARDS:
+                add(f"Shard {COSTUME_SHARDS[data.skin]} Costumes", location_name)
+        elif flags == HasteFlag.GlobalShop:
+            add("Global Locations", location_name)
+            add("Global Shop", location_name)
+        elif flags == HasteFlag.GlobalFragment:
+            add("Global Locations", location_name)
+            add("Global Fragments", location_name)
+        elif flags == HasteFlag.PerShardShop:
+            add(f"Shard {data.shard}", location_name)
+            add(f"Shard {data.shard} Shop", location_name)
+        elif flags == HasteFlag.PerShardFragment:
+            add(f"Shard {data.shard}", location_name)
+            add(f"Shard {data.shard} Fragments", location_name)
+
+    return groups
+
+def plan_entries(flag: HasteFlag, shard: Optional[int] = None, limit: Optional[int] = None) -> tuple[LocationPlanEntry, ...]:
+    """Get the planned locations for a flag and shard, optionally only the first `limit` ordinals."""
+    entries = get_location_plan().get(flag, {}).get(shard, ())
+    return entries if limit is None else entries[:limit]
+
+SANITY_FLAGS = (HasteFlag.PerShardShop, HasteFlag.GlobalShop, HasteFlag.PerShardFragment, HasteFlag.GlobalFragment)
+
+
+@lru_cache(maxsize=None)
+def sanity_locations_past(limit: int) -> frozenset[str]:
+    """Every shop and fragment check whose ordinal (within its Shard, or overall for global ones) is past `limit`."""
+    return frozenset(
+        location_name
+        for flag in SANITY_FLAGS
+        for entries in get_location_plan().get(flag, {}).values()
+        for location_name, _ in entries[limit:]
+    )
+
+
+# Fragment clears between one fragmentsanity check and the next, by fragmentsanity_distribution and check number
+FRAGMENT_INCREMENTS = {
+    # linear: every linear_fragmentsanity_rate clears
+    1: lambda check, rate: rate,
+    # balanced triangular: halved triangular steps, capped at 10 clears
+    3: lambda check, rate: min((check + 1) // 2, 10),
+    # triangular
+    4: lambda check, rate: check,
+}
+
+
+@lru_cache(maxsize=None)
+def fragment_thresholds(distribution: int, rate: int, quantity: int) -> tuple[int, ...]:
+    """
+    How many fragment clears each fragmentsanity check needs, in check order.
+
+    Per-Shard fragmentsanity counts clears within each Shard, so the same thresholds apply to every Shard.
+    """
+    increment = FRAGMENT_INCREMENTS[distribution]
+    return tuple(accumulate(increment(check, rate) for check in range(1, quantity + 1)))
+
+
+class LayoutLocation(NamedTuple):
+    # the region whose location list holds this location
+    region: str
+    # the region this location logically belongs to, usually the same as region
+    parent: str
+    name: str
+    # None for event locations
+    data: Optional[HasteLocationData]
+    # the locked event item placed at this location
+    event: Optional[str] = None
+
+EVENT_ITEM_DATA = HasteItemData(f"you cant see me", ItemClassification.progression, None, 1)
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def location_layout(key: HasteLayoutKey) -> tuple[LayoutLocation, ...]:
+    """
+    Lay out every location for a set of options, in creation order.
+
+    Cached per HasteLayoutKey, so slots with the same layout only build it once (see location_layout.cache_info()).
+    """
+    layout: list[LayoutLocation] = []
+
+    def add_location(location_name, data, region_name):
+        layout.append(LayoutLocation(region_name, region_name, location_name, data))
+
+    def add_segmented(entries, shardnum, segmenting, region_format, event_location_format, event_item_format):
+        if not key.segment_events:
+            for location_name, data in entries:
+                add_location(location_name, data, f"Shard {shardnum}")
+            return
+
+        # entries are ordinal-ordered, so each segment unlock event directly follows the location that completes it
+        for location_name, data in entries:
+            num = data.ordinal
+            regionnum = floor((num-1)/segmenting)
+            # the real item location
+            if num > segmenting:
+                add_location(location_name, data, region_format.format(shardnum, regionnum))
+            else:
+                add_location(location_name, data, f"Shard {shardnum}")
+            # the event item location
+            if num % segmenting == 0:
+                if num == segmenting:
+                    regionname = f"Shard {shardnum}"
                 else:
-                    shardnum = 1
-                fragnum = int(location_name.split()[-1])
-                fraglim = world.options.pershard_fragmentsanity_quantity if data.flags == HasteFlag.PerShardFragment else world.options.global_fragmentsanity_quantity
-                if fragnum <= fraglim:
-                    #print(f"fragnum = {fragnum}")
-                    # the real item location
-                    if fragnum > FRAGMENT_SEGMENTING:
-                        regionnum = floor((fragnum-1)/FRAGMENT_SEGMENTING)
-                        location = HasteLocation(world.player, location_name, regions[f"Shard {shardnum} Fragmentsanity {regionnum}"], data)
-                        regions[f"Shard {shardnum} Fragmentsanity {regionnum}"].locations.append(location)
-                        #print(f"    put in Fragmentsanity {regionnum}")
-                    else:
-                        location = HasteLocation(world.player, location_name, regions[f"Shard {shardnum}"], data)
-                        regions[f"Shard {shardnum}"].locations.append(location)
-                        #print(f"    put in Shard 1")
-                    # the event item location
-                    if fragnum % FRAGMENT_SEGMENTING == 0:
-                        regionnum = floor((fragnum-1)/FRAGMENT_SEGMENTING)
-                        if fragnum == FRAGMENT_SEGMENTING:
-                            regionname = f"Shard {shardnum}"
-                        else:
-                            regionname = f"Shard {shardnum} Fragmentsanity {regionnum}"
-                        location = HasteLocation(world.player, f"Shard{shardnum}Fragmentsanity{regionnum}Event", regions[regionname], None)
-                        location.place_locked_item(HasteItem(
-                            f"Shard{shardnum}Fragmentsanity{regionnum+1}Unlock",
-                            world.player,
-                            HasteItemData(f"you cant see me", ItemClassification.progression, None, 1),
-                            ItemClassification.progression,
-                        ))
-                        #print(f"    unlock event put in {regionname}")
-                        regions[regionname].locations.append(location)
\ No newline at end of file
+                    regionname = region_format.format(shardnum, regionnum)
+                layout.append(LayoutLocation(
+                    regionname, regionname, event_location_format.format(shardnum, regionnum), None,
+                    event_item_format.format(shardnum, regionnum+1),
+                ))
+
+    shard_count = key.shard_count
+
+    for location_name, data in plan_entries(HasteFlag.Always):
+        add_location(location_name, data, "Menu")
+
+    for shard in range(1, shard_count + 1):
+        for location_name, data in plan_entries(HasteFlag.Boss, shard):
+            add_location(location_name, data, f"Shard {shard}")
+
+    if key.captains_upgrades == 1:
+        for location_name, data in plan_entries(HasteFlag.CaptainsUpgrade):
+            add_location(location_name, data, "Menu")
+
+    if key.weeboh_purchases >= 1:
+        for location_name, data in plan_entries(HasteFlag.Fashion):
+            parent = "Menu"
+            # Crispy and Twisted Flopsy are unobtainable in the scope of AP with vanilla fashion unlocks
+            if key.weeboh_purchases == 1:
+                if (data.skin == 1 or data.skin == 7 or data.skin == 2 or data.skin == 3):
+                    continue
+            if key.weeboh_purchases == 1 or key.weeboh_purchases == 2:
+                # adding Weeboh to Shard 5 and Flopsy to Shard 7 to piggyback speed calcs, but if that Shard doesn't exist, then don't add it
+                costume_shard = COSTUME_SHARDS.get(data.skin)
+                if costume_shard is not None:
+                    if shard_count >= costume_shard: parent = f"Shard {costume_shard}"
+                    else: continue
+            layout.append(LayoutLocation("Menu", parent, location_name, data))
+
+    if key.shopsanity == 2:
+        add_segmented(plan_entries(HasteFlag.GlobalShop, 1, key.shop_quantity),
+                      1, SHOP_SEGMENTING, "Shard {} Shop {}", "Shard{}Shop{}Event", "Shard{}ShopRegion{}Unlock")
+    elif key.shopsanity == 1:
+        for shard in range(1, shard_count + 1):
+            add_segmented(plan_entries(HasteFlag.PerShardShop, shard, key.shop_quantity),
+                          shard, SHOP_SEGMENTING, "Shard {} Shop {}", "Shard{}Shop{}Event", "Shard{}ShopRegion{}Unlock")
+
+    if key.fragmentsanity == 2:
+        add_segmented(plan_entries(HasteFlag.GlobalFragment, 1, key.fragment_quantity),
+                      1, FRAGMENT_SEGMENTING, "Shard {} Fragmentsanity {}", "Shard{}Fragmentsanity{}Event", "Shard{}Fragmentsanity{}Unlock")
+    elif key.fragmentsanity == 1:
+        for shard in range(1, shard_count + 1):
+            add_segmented(plan_entries(HasteFlag.PerShardFragment, shard, key.fragment_quantity),
+                          shard, FRAGMENT_SEGMENTING, "Shard {} Fragmentsanity {}", "Shard{}Fragmentsanity{}Event", "Shard{}Fragmentsanity{}Unlock")
+
+    return tuple(layout)
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def layout_location_count(key: HasteLayoutKey) -> int:
+    """How many locations with an address a layout has, ie. how many pool items it can hold before anything is locked."""
+    return sum(1 for location in location_layout(key) if location.data is not None)
+
+
+def create_locations(world, regions) -> dict[str, HasteLocation]:
+    """
+    Create the locations for a world, returning them by name so later stages don't have to look them up.
+
+    Locations in world.nonprogress_locations are excluded, and each location is counted in world.location_counts.
+    """
+    player = world.player
+    counts: HasteLocationCounts = world.location_counts
+    locations: dict[str, HasteLocation] = {}
+    for region_name, parent, location_name, data, event in location_layout(layout_key(world.options)):
+        location = HasteLocation(player, location_name, regions[parent], data)
+        if location_name in world.nonprogress_locations:
+            location.progress_type = LocationProgressType.EXCLUDED
+        if event is not None:
+            location.place_locked_item(HasteItem(event, player, EVENT_ITEM_DATA, ItemClassification.progression))
+        regions[region_name].locations.append(location)
+        locations[location_name] = location
+        counts.add(location)
+    return locations
@@ -1,34 +1,99 @@
 import typing
-from typing import Dict
+from typing import Dict, NamedTuple, Optional
+from functools import lru_cache
 from math import floor
 
-from BaseClasses import Region, Entrance, MultiWorld, CollectionState
+from BaseClasses import Region, Entrance, MultiWorld
 
 # static variable that determines how each shop is segmented region-wise
 SHOP_SEGMENTING = 5
 FRAGMENT_SEGMENTING = 5
 
-def create_regions(world) -> Dict[str, Region]:
+# When enabled, shop and fragment checks past the first segment sit in chained subregions, each unlocked by an event
+# placed at the end of the previous segment. Every event is collectable as soon as its segment is, so the N-th purchase
+# only ever needs its Shard; with this off the checks sit directly in their Shard region and carry that same requirement,
+# without the 100 event locations, regions and entrances (at max Per-Shard sanity) each collection sweep has to walk.
+# Switching this changes the parent region of every check past the first segment, which spoiler paths and anything reading
+# Location.parent_region show: off, "Shard 3 Shop Item 08" is in "Shard 3" (Global checks are in "Shard 1"), on, it's in
+# "Shard 3 Shop 1".
+SEGMENT_EVENTS = False
 
-    def has_speed(state: CollectionState, shard) -> bool:
-        if world.options.speed_upgrade == 1:
-            if shard <= 2:
-                return True
-            elif shard <= 4:
-                return state.has("Progressive Speed Upgrade", player, 1)
-            elif shard <= 6:
-                return state.has("Progressive Speed Upgrade", player, 2) and has_an_ability(state)
-            elif shard <= 8:
-                return state.has("Progressive Speed Upgrade", player, 3) and has_an_ability(state)
-            else:
-                return state.has("Progressive Speed Upgrade", player, 4) and has_an_ability(state)
-        else:
-            if shard >= 5:
-                return has_an_ability(state)
-            return True
+# how many distinct option layouts are kept around, big asyncs tend to share a handful of configurations
+LAYOUT_CACHE_SIZE = 64
+
+
+class HasteLayoutKey(NamedTuple):
+    """
+    The options that decide which regions and locations exist, used to share layouts between slots.
+
+    Quantities are 0 when their sanity option is off.
+    """
+
+    shard_count: int
+    shopsanity: int
+    shop_quantity: int
+    fragmentsanity: int
+    fragment_quantity: int
+    captains_upgrades: int
+    weeboh_purchases: int
+    segment_events: bool
+
+
+def layout_key(options) -> HasteLayoutKey:
+    shop_quantity = {1: options.pershard_shopsanity_quantity.value, 2: options.global_shopsanity_quantity.value}
+    fragment_quantity = {1: options.pershard_fragmentsanity_quantity.value, 2: options.global_fragmentsanity_quantity.value}
+    return HasteLayoutKey(
+        shard_count=options.shard_goal.value if options.remove_post_victory_locations else 10,
+        shopsanity=options.shopsanity.value,
+        shop_quantity=shop_quantity.get(options.shopsanity.value, 0),
+        fragmentsanity=options.fragmentsanity.value,
+        fragment_quantity=fragment_quantity.get(options.fragmentsanity.value, 0),
+        captains_upgrades=options.captains_upgrades.value,
+        weeboh_purchases=options.weeboh_purchases.value,
+        segment_events=SEGMENT_EVENTS,
+    )
+
+
+class LayoutRegion(NamedTuple):
+    name: str
+    parent: str
+    entrance: str
+    # the shard this region is, its entrance needs that shard unlocked
+    shard: Optional[int] = None
+    # the segment unlock event its entrance needs
+    unlock: Optional[str] = None
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def region_layout(key: HasteLayoutKey) -> tuple[LayoutRegion, ...]:
+    """
+    Lay out every region below the menu for a set of options, in creation order.
 
-    def has_an_ability(state: CollectionState) -> bool:
-        return world.options.starting_ability > 0 or state.has("Boost Board", player, 1) or state.has("Sage's Cowl", player, 1) or state.has("Heir's Javelin", player, 1) or state.has("Wraith's Hourglass", player, 1)
+    Cached per HasteLayoutKey, so slots with the same layout only build it once (see region_layout.cache_info()).
+    """
+    layout: list[LayoutRegion] = []
+
+    for i in range (1, key.shard_count + 1):
+        layout.append(LayoutRegion(f"Shard {i}", "Menu", f"Shard {i} Entrance", shard=i))
+
+        #subregions for shops, unlocking at SHOP_SEGMENTING-purchase intervals
+        if key.segment_events and key.shopsanity and (not(key.shopsanity == 2 and i > 1)):
+            for j in range(1, min(floor(100/SHOP_SEGMENTING), 1 + floor(key.shop_quantity/SHOP_SEGMENTING))):
+                layout.append(LayoutRegion(
+                    f"Shard {i} Shop {j}", f"Shard {i}", f"Shard {i} Shop Region {j} Entrance",
+                    unlock=f"Shard{i}ShopRegion{j}Unlock",
+                ))
+
+        if key.segment_events and key.fragmentsanity and (not(key.fragmentsanity == 2 and i > 1)):
+            for j in range(1, min(floor(50/FRAGMENT_SEGMENTING), 1 + floor(key.fragment_quantity/FRAGMENT_SEGMENTING))):
+                layout.append(LayoutRegion(
+                    f"Shard {i} Fragmentsanity {j}", "Shard 1", f"Shard {i} Fragmentsanity Region {j} Entrance",
+                    unlock=f"Shard{i}Fragmentsanity{j}Unlock",
+                ))
+
+    return tuple(layout)
+
+def create_regions(world) -> Dict[str, Region]:
 
     regions: Dict[str, Region] = {}
     player = world.player
@@ -39,34 +104,16 @@ def create_regions(world) -> Dict[str, Region]:
 
     # make regions for the 10 shards, each requiring the X-1 number of progressive shards, and each connecting to the menu
     # for fill purposes, there is an argument to be made that Shard 1 locations should be in the Menu/Initial region, since fill prioritizes spheres 0 & 1 and it takes a 'sphere' to go from menu to shard 1
-    
-    shoplimit = world.options.global_shopsanity_quantity if world.options.shopsanity == 2 else world.options.pershard_shopsanity_quantity
-    fraglimit = world.options.global_fragmentsanity_quantity if world.options.fragmentsanity == 2 else world.options.pershard_fragmentsanity_quantity
-
-    for i in range (1, world.options.shard_goal + 1 if world.options.remove_post_victory_locations else 11):
-        shard_region = Region(f"Shard {i}", player, world.multiworld)
-        if i == 1:
-            connect(player, "Shard 1 Entrance", menu_region, shard_region, lambda state: (True))
-            regions["Shard 1"] = shard_region
+    for layout_region in region_layout(layout_key(world.options)):
+        region = Region(layout_region.name, player, world.multiworld)
+        if layout_region.unlock is not None:
+            requirement = world.haste_rules.event_requirement(layout_region.unlock)
         else:
-            connect(player, f"Shard {i} Entrance", menu_region, shard_region, lambda state, val=i: state.has("Progressive Shard", player, val-1) and has_speed(state, val))
-            regions[f"Shard {i}"] = shard_region
-        
-        #subregions for shops, unlocking at SHOP_SEGMENTING-purchase intervals
-        if (not(world.options.shopsanity == 2 and i > 1)):
-            for j in range(1,floor(100/SHOP_SEGMENTING)):
-                if (j < 1 + floor(shoplimit/SHOP_SEGMENTING)):
-                    shop_region = Region(f"Shard {i} Shop {j}", player, world.multiworld)
-                    connect(player, f"Shard {i} Shop Region {j} Entrance", shard_region, shop_region, lambda state, vali=i, valj=j: state.has(f"Shard{vali}ShopRegion{valj}Unlock", player))
-                    regions[f"Shard {i} Shop {j}"] = shop_region
-
-        if (not(world.options.fragmentsanity == 2 and i > 1)):
-            for j in range(1, floor(50/FRAGMENT_SEGMENTING)):
-                if (j < 1 + floor(fraglimit/FRAGMENT_SEGMENTING)):
-                    fragment_region = Region(f"Shard {i} Fragmentsanity {j}", player, world.multiworld)
-                    connect(player, f"Shard {i} Fragmentsanity Region {j} Entrance", regions["Shard 1"], fragment_region, lambda state, vali=i, valj=j: state.has(f"Shard{vali}Fragmentsanity{valj}Unlock", player))
-                    regions[f"Shard {i} Fragmentsanity {j}"] = fragment_region
-    
+            requirement = world.haste_rules.shard_requirement(layout_region.shard)
+        rule = world.haste_rules.compile(requirement)
+        connect(player, layout_region.entrance, regions[layout_region.parent], region, rule)
+        regions[layout_region.name] = region
+
     return regions
 
 
@@ -15,20 +15,31 @@ from BaseClasses import (
 )
 from BaseClasses import ItemClassification as IC
 from BaseClasses import Tutorial
-from Options import OptionError, Toggle
-from .Itempool import generate_itempool
+from Options import OptionError
+from .instrumentation import PROFILE_DIR, StageProfile, profiled_stage
+from .Itempool import generate_itempool, pool_capacity, prefill_candidate_names
 from .location_rules import set_location_access_rules
 from worlds.AutoWorld import WebWorld, World
 from .Items import (
     ITEM_TABLE,
     HasteItem,
     HasteItemData,
+    filler_sampler,
     item_factory,
-    parse_perm_quantity
+    PersistentQuantities,
+    parse_perm_quantities,
+)
+from .Locations import (
+    LOCATION_TABLE,
+    HasteLocation,
+    HasteLocationCounts,
+    build_location_name_groups,
+    fragment_thresholds,
+    get_location_catalog,
+    sanity_locations_past,
 )
-from .Locations import LOCATION_TABLE, HasteLocation, HasteFlag, HasteLocationData
 from .options import haste_option_groups, HasteOptions
-from .Regions import create_regions
+from .Regions import create_regions, layout_key
 
 
 class HasteWeb(WebWorld):
@@ -58,8 +69,9 @@ class HasteWorld(World):
     Join Zoe on an adventure in Haste.
     """
 
-    # Currently using can reach region to check for access rules. may update later
-    explicit_indirect_conditions = False
+    # Entrance rules only check for items, never for reaching other regions, so there are no indirect conditions to declare.
+    # If an entrance rule ever uses can_reach on a region, register it with multiworld.register_indirect_condition.
+    explicit_indirect_conditions = True
 
     options_dataclass = HasteOptions
     options: HasteOptions
@@ -68,8 +80,6 @@ class HasteWorld(World):
     version = "0.4.0"
     topology_present: bool = True
 
-    perm_item_dict: dict[str, int] = {}
-
     item_name_to_id: ClassVar[dict[str, int]] = {
         name: HasteItem.get_apid(data.code)
         for name, data in ITEM_TABLE.items()
@@ -89,58 +99,7 @@ class HasteWorld(World):
 
     # item_name_groups: ClassVar[dict[str, set[str]]] = item_name_groups
 
-    def get_shard_locations(shardnum) -> str:
-        res = set()
-        for location_name in LOCATION_TABLE.items():
-            if location_name[0].startswith(f"Shard {shardnum} "):
-                res.add(location_name[0])
-        return res
-    
-    def get_global_locations() -> str:
-        res = set()
-        for location_name in LOCATION_TABLE.items():
-            if location_name[0].startswith("Global "):
-                res.add(location_name[0])
-        return res
-    
-    def get_captain_locations() -> str:
-        res = set()
-        for location_name in LOCATION_TABLE.items():
-            if location_name[0].startswith("Captain's "):
-                res.add(location_name[0])
-        return res
-    
-    def get_costume_locations() -> str:
-        res = set()
-        for location_name in LOCATION_TABLE.items():
-            if location_name[0].startswith("Costume Purchase:"):
-                res.add(location_name[0])
-        return res
-    
-    def get_ability_locations() -> str:
-        res = set()
-        abilities = ["Wraith's Hourglass Purchase","Heir's Javelin Purchase","Sage's Cowl Purchase"]
-        for location_name in abilities:
-            if location_name in LOCATION_TABLE:
-                res.add(location_name)
-        return res
-
-    location_name_groups = {
-        "Shard 1": get_shard_locations(1),
-        "Shard 2": get_shard_locations(2),
-        "Shard 3": get_shard_locations(3),
-        "Shard 4": get_shard_locations(4),
-        "Shard 5": get_shard_locations(5),
-        "Shard 6": get_shard_locations(6),
-        "Shard 7": get_shard_locations(7),
-        "Shard 8": get_shard_locations(8),
-        "Shard 9": get_shard_locations(9),
-        "Shard 10": get_shard_locations(10),
-        "Global Locations": get_global_locations(),
-        "Captain's Purchases": get_captain_locations(),
-        "Costume Purchases": get_costume_locations(),
-        "Ability Purchases": get_ability_locations(),
-    }
+    location_name_groups = build_location_name_groups()
 
     required_client_version: tuple[int, int, int] = (0, 5, 0)
 
@@ -163,31 +122,28 @@ class HasteWorld(World):
         self.prefill_pool: list[str] = []
 
         self.invalid_locations: list[str] = []
+        self.haste_locations: dict[str, HasteLocation] = {}
+        self.location_counts = HasteLocationCounts()
+        # rolled in generate_early, every world keeps its own so slots and concurrent generations can't share them
+        self.perm_quantities = PersistentQuantities()
+        # only kept when HASTE_PROFILE_DIR is set, see instrumentation.py
+        self.stage_profile: Optional[StageProfile] = StageProfile() if PROFILE_DIR else None
+        # item names the rules read, set in generate_early, collect_item skips everything else
+        # item link group worlds never run generate_early and keep None, so they collect every progression item
+        self.relevant_items: Optional[frozenset[str]] = None
 
     def _determine_nonprogress_and_progress_locations(
         self,
     ) -> tuple[set[str], set[str]]:
         """
         Sort locations into non progesssion location and progression locations based on options set.
-        """
-
-        def add_flag(option: Toggle, flag: HasteFlag) -> HasteFlag:
-            return flag if option else HasteFlag.Always
 
-        options = self.options
-
-        enabled_flags = HasteFlag.Always
-        enabled_flags |= HasteFlag.Boss
-
-        # If not all the flags for a location are set, then force that location to have a non-progress item.
-        nonprogress_locations: set[str] = set()
-        progress_locations: set[str] = set()
+        Shop purchases and Fragment clears past progression_check_limit are non progression, which excludes them.
+        """
+        limit = self.options.progression_check_limit.value
 
-        for location, data in LOCATION_TABLE.items():
-            if data.flags & enabled_flags == data.flags:
-                progress_locations.add(location)
-            else:
-                nonprogress_locations.add(location)
+        nonprogress_locations: set[str] = set(sanity_locations_past(limit)) if limit > 0 else set()
+        progress_locations: set[str] = LOCATION_TABLE.keys() - nonprogress_locations
 
         assert progress_locations.isdisjoint(nonprogress_locations)
 
@@ -197,14 +153,16 @@ class HasteWorld(World):
 
     # stage_assert_generate() not used currently
 
+    @profiled_stage()
     def generate_early(self) -> None:
         """
         Setup things ready for generation.
         """
         # parse permanent item quantities
         if (self.options.permanent_items > 0):
-            for name, value in self.options.permanent_item_quantities.items():
-                self.perm_item_dict[name] = parse_perm_quantity(value, self.random)
+            self.perm_quantities = parse_perm_quantities(self.options.permanent_item_quantities.value, self.random)
+
+        self.nonprogress_locations, self.progress_locations = self._determine_nonprogress_and_progress_locations()
 
         # imcompatible settings calculations
 
@@ -215,37 +173,20 @@ class HasteWorld(World):
         if (self.options.shard_goal == 1) and (self.options.shopsanity == 0 and self.options.fragmentsanity == 0):
             raise OptionError("In order to have a Shard Goal of 1, you must enable either Shopsanity or Fragmentsanity")
 
-        # do a more precise count, just to make ABSOLUTELY sure there's enough room
-        running_locs = (self.options.shard_goal-1) if self.options.remove_post_victory_locations else 9
-        available_shards = running_locs + 1
-        running_locs += 3 # add the ability puchases afterwards
-        running_items = max(9 if not self.options.remove_post_victory_locations else self.options.shard_goal - 1, 1) + self.options.extra_shard_items + (3 if self.options.starting_ability > 0 else 4) + (6 if self.options.speed_upgrade else 0)
-        if (self.options.npc_shuffle):
-            running_items += 5
-            if not self.options.weeboh_purchases > 0: running_items -= 1
+        # the same counts the locations and item pool are created from, so this matches what create_items will see
+        self.haste_capacity = pool_capacity(self)
+        if self.haste_capacity.required > self.haste_capacity.locations:
+            raise OptionError(f"Insufficient locations ({self.haste_capacity.locations}) to fit required items ({self.haste_capacity.required}). Please enable settings that add more locations.")
+        if self.haste_capacity.required > self.haste_capacity.locations - self.haste_capacity.excluded:
+            raise OptionError(f"Only {self.haste_capacity.locations - self.haste_capacity.excluded} locations can hold the {self.haste_capacity.required} required items with a Progression Check Limit of {self.options.progression_check_limit.value}. Please raise the limit or enable settings that add more locations.")
 
-        # adds all permanent items to count
-        if (self.options.permanent_items > 0):
-            for name, num in self.perm_item_dict.items():
-                running_items += num
-
-        if (self.options.fragmentsanity == 1): running_locs += available_shards * self.options.pershard_fragmentsanity_quantity
-        elif (self.options.fragmentsanity == 2): running_locs += self.options.global_fragmentsanity_quantity
-
-        if (self.options.shopsanity == 1): running_locs += available_shards * self.options.pershard_shopsanity_quantity
-        elif (self.options.shopsanity == 2): running_locs += self.options.global_shopsanity_quantity
-
-        if (self.options.weeboh_purchases > 0):
-            running_locs += 5 if self.options.weeboh_purchases == 1 else 9
-            if available_shards < 7: running_locs -= 1 # remove flopsy
-            if available_shards < 5: running_locs -= 1 # remove weeboh
-
-        # captain's upgrades are not considered, as they add just as many useful items as locations
-
-        # print(f"items: {running_items} locs: {running_locs}")
-        if running_items > running_locs:
-            raise OptionError(f"Insufficient locations ({running_locs}) to fit required items ({running_items}). Please enable settings that add more locations.")
+        # rules only depend on options, so they are ready before start inventory is collected
+        # imported here rather than at the top, every Archipelago process imports this package but few generate Haste
+        from .rule_table import HasteRules
+        self.haste_rules = HasteRules(self.options, self.player, self)
+        self.relevant_items = self.haste_rules.relevant_items(layout_key(self.options))
 
+    @profiled_stage()
     def create_regions(self) -> None:
         """
         Create and connect regions for the Haste world.
@@ -255,10 +196,11 @@ class HasteWorld(World):
         """
 
         regions = Regions.create_regions(self)
-        Locations.create_locations(self, regions)
+        self.haste_locations = Locations.create_locations(self, regions)
         self.multiworld.regions.extend(regions.values())
 
-        self.get_location(f"Shard {self.options.shard_goal} Boss").place_locked_item(
+        goal_location = self.haste_locations[f"Shard {self.options.shard_goal} Boss"]
+        goal_location.place_locked_item(
             HasteItem(
                 "A New Future",
                 self.player,
@@ -266,7 +208,9 @@ class HasteWorld(World):
                 ItemClassification.progression,
             )
         )
+        self.location_counts.lock(goal_location)
 
+    @profiled_stage()
     def create_items(self) -> None:
         """
         Create the items for the Haste world.
@@ -276,17 +220,60 @@ class HasteWorld(World):
     # No more items, locations, or regions can be created past this point
 
     # set_rules() this is where access rules are set
+    @profiled_stage()
     def set_rules(self) -> None:
         """
         Set the access rules for the Haste world.
         """
         set_location_access_rules(self)
 
+    @profiled_stage()
     def pre_fill(self) -> None:
         """
         Apply special fill rules before the fill stage.
+
+        Restrictive slots place the goal's Shard gating items (see prefill_item_names) into a bounded set of their own
+        early locations first (see prefill_candidate_names), so the main fill doesn't have to swap them into the few
+        locations that can take them. This keeps those items local to the slot.
+
+        Items the bounded set can't take are placed into any of the slot's non-excluded empty locations instead, and
+        whatever is still left goes back into the item pool for the main fill.
         """
-        pass
+        if not self.prefill_pool:
+            return
+
+        items = item_factory(self.prefill_pool, self)
+        state = self.multiworld.get_all_state(False)
+        for item in items:
+            state.remove(item)
+
+        candidates = [self.haste_locations[name] for name in prefill_candidate_names(self, self.prefill_pool)]
+        fallback = [
+            location for location in self.haste_locations.values()
+            if location.address is not None and location.item is None
+            and location.progress_type != LocationProgressType.EXCLUDED
+        ]
+
+        locations = candidates.copy()
+        fill_restrictive(
+            self.multiworld, state, locations, items, single_player_placement=True, lock=True, allow_partial=True,
+            name="Haste Shard Pre-fill"
+        )
+        if items:
+            locations = [location for location in fallback if location.item is None]
+            self.random.shuffle(locations)
+            fill_restrictive(
+                self.multiworld, state, locations, items, single_player_placement=True, lock=True, allow_partial=True,
+                name="Haste Shard Pre-fill Fallback"
+            )
+        # fill_restrictive hands back what it couldn't place, the main fill places it like any other item
+        self.multiworld.itempool += items
+
+        # placed now, so all_state must stop adding them on top
+        self.prefill_pool = []
+        for location in fallback:
+            if location.item is not None:
+                self.location_counts.lock(location)
 
     def generate_output(self, output_directory: str) -> None:
         """
@@ -303,7 +290,16 @@ class HasteWorld(World):
         :param hint_data: A dictionary of mapping a player ID to a dictionary mapping location IDs to the extra hint
         information text. This dictionary should be modified as a side-effect of this method.
         """
-        pass
+        # fragment checks are looked up by id in the catalog, so their names never need parsing
+        catalog = get_location_catalog()
+        thresholds = tuple(self.fragment_thresholds())
+        player_hints = hint_data.setdefault(self.player, {})
+        for location in self.haste_locations.values():
+            if location.address is None:
+                continue
+            text = catalog.hint_text(location.address, thresholds)
+            if text is not None:
+                player_hints[location.address] = text
 
     # Overides the base classification of an item if not None
     def determine_item_classification(self, name: str) -> IC | None:
@@ -335,87 +331,28 @@ class HasteWorld(World):
 
         :return: The name of a filler item from this world.
         """
-        # If there are still useful items to place, place those first.
-        if len(self.useful_pool) > 0:
-            return self.useful_pool.pop()
-
-        # If there are still vanilla filler items to place, place those first.
-        if len(self.filler_pool) > 0:
-            return self.filler_pool.pop()
+        return self.get_filler_item_names(1)[0]
 
-        assert len(self.useful_pool) == 0
-        assert len(self.filler_pool) == 0
-
-        # sparks are the default filler at 100% filler, and each other trap subtracts from it
-        spark_weight =  100 - self.options.disaster_trap_weight - self.options.landing_trap_weight
-        if spark_weight < 0: spark_weight = 0
-
-        round1_weights = [
-            self.options.disaster_trap_weight,
-            self.options.landing_trap_weight,
-            spark_weight
-        ]
-        round1_items = [
-            "Disaster Trap",
-            "Landing Downgrade Trap",
-            "Anti-Spark"
-        ]
+    def get_filler_item_names(self, count: int) -> list[str]:
+        """
+        Get the names of `count` filler items in one go, for filling many locations at once.
 
-        round1 = self.multiworld.random.choices(round1_items, weights=round1_weights, k=1)[0]
-        # if the first selection is a trap, return the trap name as-is, else do a second round of weights to decide/return the quality of the anti-spark bundle
-        if round1 != "Anti-Spark":
-            return round1
-        else:
-            filler_consumables = [
-                "Anti-Spark 10 bundle",
-                "Anti-Spark 100 bundle",
-                "Anti-Spark 250 bundle",
-                "Anti-Spark 500 bundle",
-                "Anti-Spark 750 bundle",
-                "Anti-Spark 1k bundle",
-            ]
-            if (self.options.antispark_filler == 0):
-                filler_weights = [
-                    35, # 10
-                    20, # 100
-                    2,  # 250
-                    2,  # 500
-                    1,  # 750
-                    1,  # 1k
-                ]
-            elif (self.options.antispark_filler == 1):
-                filler_weights = [
-                    15, # 10
-                    10, # 100
-                    5,  # 250
-                    2,  # 500
-                    2,  # 750
-                    1,  # 1k
-                ]
-            elif (self.options.antispark_filler == 2):
-                filler_weights = [
-                    10, # 10
-                    5,  # 100
-                    5,  # 250
-                    2,  # 500
-                    2,  # 750
-                    2,  # 1k
-                ]
-            else:
-                filler_weights = [
-                    5,  #10
-                    5,  # 100
-                    5,  # 250
-                    3,  # 500
-                    3,  # 750
-                    3,  # 1k
-                ]
-            assert len(filler_consumables) == len(
-                filler_weights
-            ), f"{len(filler_consumables)=}, {len(filler_weights)=}"
-            return self.multiworld.random.choices(
-                filler_consumables, weights=filler_weights, k=1
-            )[0]
+        :return: The names of filler items from this world.
+        """
+        # If there are still useful items to place, place those first, then the vanilla filler items.
+        names: list[str] = []
+        for pool in (self.useful_pool, self.filler_pool):
+            while pool and len(names) < count:
+                names.append(pool.pop())
+
+        if len(names) < count:
+            sampler = filler_sampler(
+                self.options.disaster_trap_weight.value,
+                self.options.landing_trap_weight.value,
+                self.options.antispark_filler.value,
+            )
+            names.extend(sampler.sample(self.multiworld.random, count - len(names)))
+        return names
 
     def get_pre_fill_items(self) -> list[Item]:
         """
@@ -429,48 +366,29 @@ class HasteWorld(World):
             assert isinstance(pre_fiill_items, list)
         return pre_fiill_items
 
+    def fragment_thresholds(self) -> list[int]:
+        """The fragment clears each fragmentsanity check needs, the same in every Shard for Per-Shard, empty when off."""
+        quantity = layout_key(self.options).fragment_quantity
+        if not quantity:
+            return []
+        return list(fragment_thresholds(
+            self.options.fragmentsanity_distribution.value, self.options.fragmentsanity_linear_rate.value, quantity
+        ))
+
+    @profiled_stage(report=True)
     def fill_slot_data(self) -> Mapping[str, Any]:
         """
         Return the `slot_data` field that will be in the `Connected` network package.
 
         This is a way the generator can give custom data to the client.
         The client will receive this as JSON in the `Connected` response.
+        It uses the versioned format from slot_data.py (long keys until COMPACT_SLOT_DATA is on), read it back with
+        `read_slot_data`.
 
         :return: A dictionary to be sent to the client when it connects to the server.
         """
-        slot_data = {
-            "Version": self.version,
-            "DeathLink": self.options.death_link.value,
-            "ForceReload": self.options.force_reload.value,
-            "Shard Goal": self.options.shard_goal.value,
-            "Shard Unlock Order": self.options.shard_unlock_order.value,
-            "Remove Post-Victory Locaitons": self.options.remove_post_victory_locations.value,
-            "Extra Shard Items": self.options.extra_shard_items.value,
-            "Shopsanity": self.options.shopsanity.value,
-            "Per-Shard Shopsanity Quantity": self.options.pershard_shopsanity_quantity.value,
-            "Global Shopsanity Quantity": self.options.global_shopsanity_quantity.value,
-            "Shopsanity Seperate": self.options.shopsanity_seperate.value,
-            "Shopsanity Seperate Rate": self.options.shopsanity_seperate_rate.value,
-            "Fragmentsanity": self.options.fragmentsanity.value,
-            "Fragmentsanity Distribution": self.options.fragmentsanity_distribution.value,
-            "Per-Shard Fragmentsanity Quantity": self.options.pershard_fragmentsanity_quantity.value,
-            "Global Fragmentsanity Quantity": self.options.global_fragmentsanity_quantity.value,
-            "Linear Fragmentsanity Rate": self.options.fragmentsanity_linear_rate.value,
-            "NPC Shuffle": self.options.npc_shuffle.value,
-            "Captain's Upgrades": self.options.captains_upgrades.value,
-            "Fashion Weeboh's Purchases": self.options.weeboh_purchases.value,
-            "Speed Upgrades": self.options.speed_upgrade.value,
-            "Starting Ability": self.options.starting_ability.value,
-            "Persistent Items": self.options.permanent_items.value, # thank god the mod doesnt need the exact quantities or i'd die
-            "Remove Post-Victory Locations": self.options.remove_post_victory_locations.value,
-            "Default Outfit Body": self.options.default_outfit_body.value,
-            "Default Outfit Hat": self.options.default_outfit_hat.value,
-            "Anti-Spark Filler": self.options.antispark_filler.value,
-            "Disaster Trap Weight": self.options.disaster_trap_weight.value,
-            "Landing Downgrade Trap Weight": self.options.landing_trap_weight.value,
-            "Unlock All Items": self.options.unlock_all_items.value,
-            # "S-Rank Bonus": self.options.s_rank_bonus.value
-        }
+        from .slot_data import build_slot_data
+        slot_data = build_slot_data(self)
 
         return slot_data
 
@@ -484,7 +402,7 @@ class HasteWorld(World):
         :param item: Item to decide on if it should be collected into state
         :param remove: indicate if this is meant to remove from state instead of adding.
         """
-        # Adding non progession items that are useful for logic (Non progression IC but used in logic (Trying to cut down on item count))
-        if item.advancement:
+        # Only progression items some rule of this world reads are collected, so prog_items stays small to copy in sweeps
+        if item.advancement and (self.relevant_items is None or item.name in self.relevant_items):
             return item.name
         return None
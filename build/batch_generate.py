@@ -0,0 +1,184 @@
+"""
+Generate many Haste-only seeds in parallel, eg. to pre-generate race seeds from a few yaml variants.
+
+Run from the root of an Archipelago checkout with the world installed in `worlds/`, eg:
+    python -m worlds.haste.build.batch_generate worlds/haste/haste.yaml --seeds 200 --race --out race_seeds.jsonl
+
+Every seed takes one of the yaml documents (round robin) and goes through Archipelago's own `Generate.main` and
+`Main.main`, so plando, start inventory, local/non-local items, item links and output all happen as they would for a
+normal generation. Each seed gets its own output directory under --output-dir, and is written to the JSONL file as soon
+as it finishes, with the path of its output file.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, NamedTuple, Optional
+
+# yaml documents generated from by this worker, set by _init_worker
+_VARIANTS: list[dict[str, Any]] = []
+
+
+class SeedTask(NamedTuple):
+    index: int
+    variant: int
+    seed: int
+    output_directory: str
+    # extra Generate.py arguments, eg. --race or --spoiler 0
+    generate_args: tuple[str, ...]
+
+
+def load_variants(paths: list[str]) -> list[dict[str, Any]]:
+    """Read every yaml document in the given files, each one is a variant seeds can be generated from."""
+    from Utils import parse_yamls
+
+    variants: list[dict[str, Any]] = []
+    for path in paths:
+        with open(path, encoding="utf-8-sig") as file:
+            variants.extend(document for document in parse_yamls(file.read()) if document)
+    return variants
+
+
+def _init_worker(variants: list[dict[str, Any]]) -> None:
+    """
+    Warm a worker process up once, so seeds only pay for generation itself.
+
+    Importing `worlds` loads every world as the generator does, Generate and Main are imported ahead of time, and the
+    shared Haste tables are built.
+    """
+    global _VARIANTS
+    _VARIANTS = variants
+
+    import worlds  # noqa: F401
+    import Generate  # noqa: F401
+    import Main  # noqa: F401
+
+    from ..Locations import get_location_catalog, get_location_plan
+
+    get_location_catalog()
+    get_location_plan()
+
+
+def output_file(directory: str) -> Optional[str]:
+    """The multiworld zip Main wrote into a seed's output directory, if it wrote one."""
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".zip"):
+            return os.path.join(directory, name)
+    return None
+
+
+def generate_seed(task: SeedTask) -> dict[str, Any]:
+    """Generate one seed through Generate.main and Main.main, returning a JSON-friendly summary of how it went."""
+    import yaml
+
+    import Generate
+    import Main
+
+    result: dict[str, Any] = {"index": task.index, "variant": task.variant, "seed": task.seed, "pid": os.getpid()}
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    try:
+        os.makedirs(task.output_directory, exist_ok=True)
+        with tempfile.TemporaryDirectory() as players:
+            # Generate reads player yamls from a directory, so this seed's variant gets one of its own
+            with open(os.path.join(players, "haste.yaml"), "w", encoding="utf-8") as file:
+                yaml.dump(_VARIANTS[task.variant], file, allow_unicode=True, sort_keys=False)
+            args = Generate.mystery_argparse([
+                "--player_files_path", players,
+                "--seed", str(task.seed),
+                "--outputpath", task.output_directory,
+                "--multi", "1",
+                *task.generate_args,
+            ])
+            erargs, seed = Generate.main(args)
+        timings["generate"] = time.perf_counter() - start
+
+        main_start = time.perf_counter()
+        multiworld = Main.main(erargs, seed)
+        timings["main"] = time.perf_counter() - main_start
+
+        world = multiworld.worlds[1]
+        result["output"] = output_file(task.output_directory)
+        result["ok"] = result["output"] is not None
+        result["seed_name"] = multiworld.seed_name
+        result["locations"] = len(world.haste_locations)
+        result["options"] = {
+            name: getattr(world.options, name).value
+            for name in ("shard_goal", "shopsanity", "fragmentsanity", "npc_shuffle", "speed_upgrade")
+        }
+    except Exception as error:
+        result["ok"] = False
+        result["error"] = f"{type(error).__name__}: {error}"
+        result["traceback"] = traceback.format_exc()
+    timings["total"] = time.perf_counter() - start
+    result["timings"] = {step: round(elapsed, 6) for step, elapsed in timings.items()}
+    return result
+
+
+def batch_generate(variants: list[dict[str, Any]], seeds: int, out: str, output_directory: str,
+                   workers: Optional[int] = None, base_seed: Optional[int] = None,
+                   generate_args: tuple[str, ...] = ()) -> int:
+    """
+    Generate `seeds` seeds over a pool of warmed up worker processes, writing each result to `out` as it finishes.
+
+    Every seed writes its output into its own directory under `output_directory`.
+
+    :return: how many seeds failed.
+    """
+    if not variants:
+        raise ValueError("no yaml documents to generate from")
+    base_seed = random.randrange(2 ** 32) if base_seed is None else base_seed
+    tasks = [
+        SeedTask(index, index % len(variants), base_seed + index,
+                 os.path.join(output_directory, f"seed_{index:04}"), generate_args)
+        for index in range(seeds)
+    ]
+
+    failed = 0
+    start = time.perf_counter()
+    with open(out, "w", encoding="utf-8") as file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(variants,)) as executor:
+        futures = [executor.submit(generate_seed, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            failed += not result["ok"]
+            file.write(json.dumps(result) + "\n")
+            file.flush()
+            print(f"[{done}/{seeds}] seed {result['seed']}: {result.get('output') if result['ok'] else result.get('error')} "
+                  f"({result['timings']['total']:.2f}s)")
+
+    elapsed = time.perf_counter() - start
+    print(f"{seeds} seeds in {elapsed:.2f}s ({seeds / elapsed:.2f} seeds/s), {failed} failed, results in {out}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("yamls", nargs="+", help="yaml files, every document in them is a variant")
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--base-seed", type=int, default=None, help="seed of the first generation, the rest count up")
+    parser.add_argument("--out", default="haste_batch.jsonl")
+    parser.add_argument("--output-dir", default="haste_batch", help="each seed's output goes in a directory in here")
+    parser.add_argument("--race", action="store_true", help="generate race seeds, passed on to Generate")
+    parser.add_argument("--spoiler", type=int, default=None, help="spoiler level, passed on to Generate")
+    args = parser.parse_args()
+
+    generate_args: list[str] = []
+    if args.race:
+        generate_args.append("--race")
+    if args.spoiler is not None:
+        generate_args += ["--spoiler", str(args.spoiler)]
+
+    failed = batch_generate(load_variants(args.yamls), args.seeds, args.out, args.output_dir, args.workers,
+                            args.base_seed, tuple(generate_args))
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
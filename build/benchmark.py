@@ -0,0 +1,707 @@
+"""
+Benchmarks for the Haste world.
+
+Run from the root of an Archipelago checkout with the world installed in `worlds/`, eg:
+    python -m worlds.haste.build.benchmark import
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+WORLD_PACKAGE = __package__.rsplit(".", 1)[0] if __package__ else "worlds.haste"
+
+
+_IMPORT_SCRIPT = """
+import importlib, sys, time
+sys.path[:0] = {paths!r}
+import worlds
+from worlds.AutoWorld import AutoWorldRegister
+
+# Archipelago has already loaded every world, so drop ours and time a clean re-import of just this package.
+# Shared dependencies (BaseClasses, Options, stdlib) stay loaded, as they would be for any other world.
+for name in [name for name in sys.modules if name == {package!r} or name.startswith({package!r} + ".")]:
+    del sys.modules[name]
+del AutoWorldRegister.world_types["Haste"]
+
+start = time.perf_counter()
+importlib.import_module({package!r})
+print(int((time.perf_counter() - start) * 1e6))
+"""
+
+
+def _import_time_us(package: str = WORLD_PACKAGE, paths: tuple[str, ...] = ()) -> int:
+    """Import a world package in a fresh interpreter and return how long it took."""
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SCRIPT.format(package=package, paths=list(paths))],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+# what a git revision of the world is imported as, next to the installed one
+BASELINE_PACKAGE = "haste_baseline"
+
+
+def _export_revision(revision: str, directory: str) -> None:
+    """Export the world at a git revision into `directory` as the BASELINE_PACKAGE package."""
+    world_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    archive = subprocess.run(
+        ["git", "-C", world_directory, "archive", "--format=tar", revision],
+        capture_output=True,
+        check=True,
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(os.path.join(directory, BASELINE_PACKAGE), filter="data")
+
+
+def setup_haste_multiworld(players: int, options: dict, seed: int, steps: Optional[tuple[str, ...]] = None,
+                           timings: Optional[dict[str, float]] = None):
+    """
+    Build a multiworld of `players` Haste slots sharing `options`, the same way Archipelago's WorldTestBase does.
+
+    :param steps: generation steps to call, defaults to every step before fill.
+    :param timings: if given, the wall time of each step is added to it.
+    """
+    from argparse import Namespace
+
+    from BaseClasses import CollectionState, MultiWorld
+    from test.general import gen_steps
+    from worlds.AutoWorld import call_all
+
+    from .. import HasteWorld
+
+    multiworld = MultiWorld(players)
+    multiworld.game = {player: HasteWorld.game for player in multiworld.player_ids}
+    multiworld.player_name = {player: f"Haste{player}" for player in multiworld.player_ids}
+    multiworld.set_seed(seed)
+    args = Namespace()
+    for name, option in HasteWorld.options_dataclass.type_hints.items():
+        setattr(args, name, {
+            player: option.from_any(options.get(name, option.default)) for player in multiworld.player_ids
+        })
+    multiworld.set_options(args)
+    multiworld.state = CollectionState(multiworld)
+
+    for step in gen_steps if steps is None else steps:
+        start = time.perf_counter()
+        call_all(multiworld, step)
+        if timings is not None:
+            timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+    return multiworld
+
+
+def fill_multiworld(multiworld, timings: Optional[dict[str, float]] = None) -> None:
+    """Run the fill stages on a multiworld from `setup_haste_multiworld`."""
+    from Fill import distribute_items_restrictive
+    from worlds.AutoWorld import call_all
+
+    start = time.perf_counter()
+    distribute_items_restrictive(multiworld)
+    call_all(multiworld, "post_fill")
+    if timings is not None:
+        timings["fill"] = timings.get("fill", 0.0) + time.perf_counter() - start
+
+
+# every check Haste can have turned on
+MAX_SANITY_OPTIONS = {
+    "shard_goal": 10,
+    "remove_post_victory_locations": False,
+    "shopsanity": "per_shard",
+    "pershard_shopsanity_quantity": 25,
+    "fragmentsanity": "per_shard",
+    "pershard_fragmentsanity_quantity": 25,
+    "captains_upgrades": True,
+    "weeboh_purchases": "all_unlocks",
+}
+
+
+def bench_import(runs: int, baseline: Optional[str]) -> None:
+    """
+    Measure what importing the Haste world costs every Archipelago process, against a baseline git revision.
+
+    The generator, server and WebHost all import every world through `worlds`, so this is paid even when
+    no Haste slot is present. The lazily built tables are timed separately to show what is deferred.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        variants = [("current", WORLD_PACKAGE, ())]
+        if baseline:
+            _export_revision(baseline, directory)
+            variants.insert(0, (baseline, BASELINE_PACKAGE, (directory,)))
+
+        medians: dict[str, float] = {}
+        for label, package, paths in variants:
+            samples = [_import_time_us(package, paths) for _ in range(runs)]
+            medians[label] = statistics.median(samples)
+            print(f"{label} import over {runs} runs")
+            print(f"  median: {medians[label]:>8.0f} us")
+            print(f"  min:    {min(samples):>8.0f} us")
+
+    if baseline:
+        saved = medians[baseline] - medians["current"]
+        print(f"current vs {baseline}: {saved:>8.0f} us saved per process ({saved / medians[baseline]:.0%})")
+
+    from ..Locations import get_location_catalog, get_location_plan
+
+    print("deferred until first use")
+    for getter in (get_location_catalog, get_location_plan):
+        getter.cache_clear()
+        start = time.perf_counter()
+        getter()
+        print(f"  {getter.__name__}: {(time.perf_counter() - start) * 1e6:>8.0f} us")
+
+
+def bench_layout(slots: int) -> None:
+    """Time laying out regions and locations for many slots that share the largest Haste configuration."""
+    from ..Locations import location_layout
+    from ..Regions import HasteLayoutKey, region_layout
+
+    key = HasteLayoutKey(
+        shard_count=10, shopsanity=1, shop_quantity=25, fragmentsanity=1, fragment_quantity=25,
+        captains_upgrades=1, weeboh_purchases=3, segment_events=True,
+    )
+    for layout in (region_layout, location_layout):
+        layout.cache_clear()
+        start = time.perf_counter()
+        for _ in range(slots):
+            layout(key)
+        elapsed = time.perf_counter() - start
+        print(f"{layout.__name__} for {slots} identical slots: {elapsed * 1e3:.2f} ms ({layout.cache_info()})")
+
+
+def bench_gating(seeds: int, players: int) -> None:
+    """Compare generation time with segment unlock events against plain Shard gating, at max shopsanity and fragmentsanity."""
+    from .. import Regions
+
+    default = Regions.SEGMENT_EVENTS
+    try:
+        for segment_events in (True, False):
+            Regions.SEGMENT_EVENTS = segment_events
+            timings: dict[str, float] = {}
+            for seed in range(seeds):
+                multiworld = setup_haste_multiworld(players, MAX_SANITY_OPTIONS, seed, timings=timings)
+                fill_multiworld(multiworld, timings)
+            print(f"SEGMENT_EVENTS={segment_events}: {players} players, mean over {seeds} seeds")
+            for step, elapsed in timings.items():
+                print(f"  {step:<16} {elapsed / seeds * 1e3:>10.2f} ms")
+            print(f"  {'total':<16} {sum(timings.values()) / seeds * 1e3:>10.2f} ms")
+    finally:
+        Regions.SEGMENT_EVENTS = default
+
+
+def bench_reachability(players: int, seed: int, repeats: int) -> None:
+    """
+    Time update_reachable_regions while collecting every progression item of a multiworld of Haste slots,
+    with explicit indirect conditions on and off, and count the entrance checks it makes.
+    """
+    from BaseClasses import CollectionState, Entrance
+
+    from .. import HasteWorld
+
+    multiworld = setup_haste_multiworld(players, MAX_SANITY_OPTIONS, seed)
+    items = [item for item in multiworld.itempool if item.advancement]
+    multiworld.random.shuffle(items)
+
+    default = HasteWorld.explicit_indirect_conditions
+    can_reach = Entrance.can_reach
+    checks: Counter = Counter()
+
+    def counted_can_reach(entrance, state):
+        checks[HasteWorld.explicit_indirect_conditions] += 1
+        return can_reach(entrance, state)
+
+    try:
+        for explicit in (False, True):
+            HasteWorld.explicit_indirect_conditions = explicit
+            Entrance.can_reach = counted_can_reach
+            start = time.perf_counter()
+            for _ in range(repeats):
+                state = CollectionState(multiworld)
+                for item in items:
+                    state.collect(item, True)
+                    state.update_reachable_regions(item.player)
+            elapsed = time.perf_counter() - start
+            # timed with the counting wrapper in place, so both runs pay for it alike
+            Entrance.can_reach = can_reach
+            print(f"explicit_indirect_conditions={explicit}: {elapsed / repeats * 1e3:.2f} ms "
+                  f"per pass, {checks[explicit] / repeats:.0f} entrance checks ({len(items)} items, {players} players)")
+    finally:
+        HasteWorld.explicit_indirect_conditions = default
+        Entrance.can_reach = can_reach
+
+
+def legacy_location_rules(world) -> dict:
+    """
+    The hand-written location closures the rule table replaced, kept here to benchmark against.
+
+    Abilities are looked up by StartingAbility option, as the rule table does.
+    """
+    from ..options import StartingAbility
+
+    options = world.options
+    player = world.player
+    starting_abilities = {
+        "Courier's Board": StartingAbility.option_couriers_board,
+        "Sage's Cowl": StartingAbility.option_sages_cowl,
+        "Heir's Javelin": StartingAbility.option_heirs_javelin,
+        "Wraith's Hourglass": StartingAbility.option_wraiths_hourglass,
+    }
+
+    def has_NPC(state, npc) -> bool:
+        if options.npc_shuffle:
+            return state.has(npc, player, 1)
+        else:
+            return True
+
+    def fashion_unlock(state, skin) -> bool:
+        if options.weeboh_purchases < 3:
+            if skin == 10:
+                return state.has("Progressive Shard", player, 4)
+            elif skin == 6:
+                return state.has("Progressive Shard", player, 6)
+            elif skin == 5:
+                return has_ability(state, "Sage's Cowl") and has_ability(state, "Heir's Javelin") and has_ability(state, "Wraith's Hourglass")
+        return True
+
+    def has_ability(state, ability) -> bool:
+        return options.starting_ability == starting_abilities[ability] or state.has(ability, player, 1)
+
+    captain = lambda state: state.has("Progressive Shard", player, 1) and has_NPC(state, "The Captain")
+    fashion = lambda state: state.has("Progressive Shard", player, 1) and has_NPC(state, "Fashion Weeboh")
+    rules = {
+        "Wraith's Hourglass Purchase": lambda state: state.has("Progressive Shard", player, 1) and has_NPC(state, "Wraith"),
+        "Heir's Javelin Purchase": lambda state: state.has("Progressive Shard", player, 1) and has_NPC(state, "Niada"),
+        "Sage's Cowl Purchase": lambda state: state.has("Progressive Shard", player, 1) and has_NPC(state, "Daro"),
+        "Shard 1 Boss": lambda state: True,
+        "Costume Purchase: Totally Accurate Zoe": lambda state: fashion(state) and fashion_unlock(state, 5),
+        "Costume Purchase: Flopsy": lambda state: fashion(state) and fashion_unlock(state, 6),
+        "Costume Purchase: Weeboh": lambda state: fashion(state) and fashion_unlock(state, 10),
+    }
+    for i in range(2, 11):
+        rules[f"Shard {i} Boss"] = lambda state, val=i: state.has("Progressive Shard", player, val - 1)
+    for name in world.haste_locations:
+        if name.startswith("Captain's"):
+            rules[name] = captain
+        elif name.startswith("Costume Purchase") and name not in rules:
+            rules[name] = fashion
+        elif " Shop Item " in name or " Fragment Clear " in name:
+            rules[name] = lambda state: True
+    return rules
+
+
+def bench_rules(states: int, seed: int) -> None:
+    """
+    Time the compiled location rules against the hand-written closures they replaced, over random inventories.
+
+    Both have to agree on every location, so this doubles as a check of the rule table.
+    """
+    from BaseClasses import CollectionState
+
+    multiworld = setup_haste_multiworld(1, dict(MAX_SANITY_OPTIONS, npc_shuffle=True), seed)
+    world = multiworld.worlds[1]
+    legacy_rules = legacy_location_rules(world)
+    checks = [
+        (location.access_rule, legacy_rules[name])
+        for name, location in world.haste_locations.items()
+        if location.address is not None
+    ]
+
+    inventories = []
+    items = list(multiworld.itempool)
+    for _ in range(states):
+        state = CollectionState(multiworld)
+        for item in multiworld.random.sample(items, multiworld.random.randrange(len(items))):
+            state.collect(item, True)
+        inventories.append(state)
+
+    start = time.perf_counter()
+    compiled_results = [rule(state) for state in inventories for rule, _ in checks]
+    compiled_time = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy_results = [rule(state) for state in inventories for _, rule in checks]
+    legacy_time = time.perf_counter() - start
+
+    assert compiled_results == legacy_results, "compiled rules disagree with the closures they replaced"
+    evaluations = len(compiled_results)
+    print(f"{len(checks)} locations, {len(set(world.haste_rules.compiled.values()))} distinct rules, "
+          f"{evaluations} evaluations")
+    print(f"  compiled: {evaluations / compiled_time / 1e6:>6.2f} M rules/s")
+    print(f"  closures: {evaluations / legacy_time / 1e6:>6.2f} M rules/s")
+
+
+def bench_filler(count: int, seed: int) -> None:
+    """Time drawing filler one item at a time from fresh weight lists, as before, against one batched alias draw."""
+    import random
+
+    from ..Items import ANTISPARK_BUNDLES, ANTISPARK_FILLER_WEIGHTS, filler_sampler
+
+    options = (10, 10, 1)
+
+    def one_at_a_time(rng: random.Random) -> str:
+        disaster, landing, antispark = options
+        spark = max(0, 100 - disaster - landing)
+        round1 = rng.choices(["Disaster Trap", "Landing Downgrade Trap", "Anti-Spark"], weights=[disaster, landing, spark])[0]
+        if round1 != "Anti-Spark":
+            return round1
+        return rng.choices(list(ANTISPARK_BUNDLES), weights=list(ANTISPARK_FILLER_WEIGHTS[antispark]))[0]
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    [one_at_a_time(rng) for _ in range(count)]
+    single = time.perf_counter() - start
+
+    filler_sampler.cache_clear()
+    start = time.perf_counter()
+    filler_sampler(*options).sample(rng, count)
+    batched = time.perf_counter() - start
+    print(f"{count} filler items")
+    print(f"  one at a time: {single * 1e3:>8.2f} ms")
+    print(f"  batched:       {batched * 1e3:>8.2f} ms")
+
+
+def bench_pool(rounds: int) -> None:
+    """Time the item quantity table and pool builder over every combination of the options that shape the pool."""
+    import itertools
+
+    from ..Itempool import HastePoolKey, build_item_pools, item_quantity_table
+    from ..Items import PersistentQuantities
+
+    perm_choices = (
+        PersistentQuantities(),
+        PersistentQuantities(2, 2, 2, 2, 2, 2, 1, 1, 1, 1),
+        PersistentQuantities(*(10,) * len(PersistentQuantities._fields)),
+    )
+    keys = [
+        HastePoolKey(shard_items, *flags, starting_ability, perm_quantities)
+        for shard_items in (1, 4, 9, 19)
+        for flags in itertools.product((False, True), repeat=4)
+        for starting_ability in range(5)
+        for perm_quantities in perm_choices
+    ]
+
+    item_quantity_table.cache_clear()
+    start = time.perf_counter()
+    for key in keys:
+        item_quantity_table(key)
+    tables = time.perf_counter() - start
+
+    # slot by slot, so each key's table is cached while its slots are built
+    start = time.perf_counter()
+    for key in keys:
+        for _ in range(rounds):
+            build_item_pools(key)
+    pools = time.perf_counter() - start
+    print(f"{len(keys)} option combinations")
+    print(f"  quantity tables: {tables / len(keys) * 1e6:>8.2f} us each, built once")
+    print(f"  pools:           {pools / rounds / len(keys) * 1e6:>8.2f} us each ({item_quantity_table.cache_info()})")
+
+
+def bench_items(count: int, seed: int) -> None:
+    """Time creating a large pool one create_item call at a time against the bulk item_factory path."""
+    from ..Items import item_factory
+
+    multiworld = setup_haste_multiworld(1, MAX_SANITY_OPTIONS, seed, steps=("generate_early",))
+    world = multiworld.worlds[1]
+    names = world.get_filler_item_names(count)
+
+    start = time.perf_counter()
+    [world.create_item(name) for name in names]
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    items = item_factory(names, world)
+    bulk = time.perf_counter() - start
+    print(f"{count} items, {len(set(names))} distinct names, {sys.getsizeof(items[0])} bytes each")
+    print(f"  create_item:  {single * 1e3:>8.2f} ms")
+    print(f"  item_factory: {bulk * 1e3:>8.2f} ms")
+
+
+def check_concurrency(seeds: int, players: int) -> None:
+    """
+    Generate the same seeds one after another and then all at once in threads, and check every slot's item pool matches.
+
+    Slots roll random persistent item quantities, so any state shared between worlds or generations shows up here.
+    """
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    options = dict(MAX_SANITY_OPTIONS, permanent_items="on", permanent_item_quantities={
+        key: "random" for key in ("common_speed", "rare_speed", "epic_speed", "legendary")
+    })
+
+    def pools(seed: int) -> list[Counter]:
+        multiworld = setup_haste_multiworld(players, options, seed)
+        return [Counter(item.name for item in multiworld.itempool if item.player == player)
+                for player in multiworld.player_ids]
+
+    sequential = [pools(seed) for seed in range(seeds)]
+    with ThreadPoolExecutor() as executor:
+        concurrent = list(executor.map(pools, range(seeds)))
+    assert sequential == concurrent, "concurrent generations produced different item pools"
+    print(f"{seeds} seeds of {players} players match when generated concurrently")
+
+
+def bench_spheres(states: int, seed: int) -> None:
+    """
+    Time the count-based reachability calculator against CollectionState over random inventories, checking that both
+    reach the same locations.
+    """
+    from BaseClasses import CollectionState
+
+    from ..reachability import HasteReachability, cross_check
+
+    multiworld = setup_haste_multiworld(1, MAX_SANITY_OPTIONS, seed)
+    world = multiworld.worlds[1]
+    items = [item for item in multiworld.itempool if item.advancement]
+    inventories = []
+    for _ in range(states):
+        state = CollectionState(multiworld)
+        for item in multiworld.random.sample(items, multiworld.random.randrange(len(items))):
+            state.collect(item, True)
+        inventories.append(state)
+
+    mismatches = sum(any(cross_check(world, state)) for state in inventories)
+    assert not mismatches, f"{mismatches} inventories reach different locations"
+
+    reachability = HasteReachability.for_world(world)
+    start = time.perf_counter()
+    for state in inventories:
+        reachability.reachable(state.prog_items[world.player])
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    for state in inventories:
+        [location for location in world.haste_locations.values() if location.can_reach(state)]
+    generic = time.perf_counter() - start
+    print(f"{len(world.haste_locations)} locations in {len(reachability.groups)} thresholds, {states} inventories agree")
+    print(f"  HasteReachability: {fast / states * 1e6:>10.1f} us per inventory")
+    print(f"  CollectionState:   {generic / states * 1e6:>10.1f} us per inventory")
+
+
+# Fill functions whose calls show how much work fill did: every swap_location_item call is a placed item fill_restrictive
+# had to swap out to fit one it couldn't place, and remaining_fill is the final pass over whatever is left
+FILL_WORK_FUNCTIONS = ("fill_restrictive", "swap_location_item", "remaining_fill")
+
+
+@contextmanager
+def counted_fill_calls(counts: Counter):
+    """Count calls to FILL_WORK_FUNCTIONS into `counts` while fill runs."""
+    import Fill
+
+    originals = {name: getattr(Fill, name) for name in FILL_WORK_FUNCTIONS}
+
+    def counted(name, function):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    for name, function in originals.items():
+        setattr(Fill, name, counted(name, function))
+    try:
+        yield counts
+    finally:
+        for name, function in originals.items():
+            setattr(Fill, name, function)
+
+
+def bench_exclusion(limits: list[int], seeds: int, players: int) -> None:
+    """
+    Show how progression_check_limit shrinks the locations fill can put progression into, and what fill costs with it,
+    at max shopsanity and fragmentsanity. A limit of 0 is the unlimited baseline.
+    """
+    from BaseClasses import LocationProgressType
+
+    for limit in limits:
+        options = dict(MAX_SANITY_OPTIONS, speed_upgrade=True, npc_shuffle=True, progression_check_limit=limit)
+        timings: dict[str, float] = {}
+        calls: Counter = Counter()
+        candidates = locations = 0
+        for seed in range(seeds):
+            multiworld = setup_haste_multiworld(players, options, seed, timings=timings)
+            for location in multiworld.get_locations():
+                if location.address is not None and location.item is None:
+                    locations += 1
+                    candidates += location.progress_type != LocationProgressType.EXCLUDED
+            with counted_fill_calls(calls):
+                fill_multiworld(multiworld, timings)
+        print(f"progression_check_limit={limit}: {candidates / seeds:.0f} of {locations / seeds:.0f} locations can take "
+              f"progression ({players} players), fill {timings['fill'] / seeds * 1e3:.2f} ms")
+        print("  per seed: " + ", ".join(f"{calls[name] / seeds:.1f} {name}" for name in FILL_WORK_FUNCTIONS))
+
+
+# a small restrictive slot: few locations outside the Shard bosses, with speed upgrades and no starting ability
+RESTRICTIVE_OPTIONS = {
+    "shard_goal": 6,
+    "remove_post_victory_locations": True,
+    "shopsanity": "per_shard",
+    "pershard_shopsanity_quantity": 2,
+    "fragmentsanity": "off",
+    "speed_upgrade": True,
+    "starting_ability": "none",
+}
+
+
+def bench_prefill(seeds: int, players: int) -> None:
+    """Compare fill time and failures of restrictive slots with and without the Shard pre-fill."""
+    from Fill import FillError
+
+    from .. import Itempool
+
+    default = Itempool.PREFILL_PROGRESSION_RATIO
+    try:
+        for ratio in (float("inf"), default):
+            Itempool.PREFILL_PROGRESSION_RATIO = ratio
+            timings: dict[str, float] = {}
+            failures = 0
+            for seed in range(seeds):
+                try:
+                    multiworld = setup_haste_multiworld(players, RESTRICTIVE_OPTIONS, seed, timings=timings)
+                    fill_multiworld(multiworld, timings)
+                except FillError:
+                    failures += 1
+            label = "off" if ratio == float("inf") else f"ratio {ratio}"
+            per_seed = (timings.get("pre_fill", 0.0) + timings.get("fill", 0.0)) / seeds
+            print(f"pre-fill {label}: {per_seed * 1e3:.2f} ms pre_fill + fill per seed, "
+                  f"{failures} of {seeds} seeds failed ({players} players)")
+    finally:
+        Itempool.PREFILL_PROGRESSION_RATIO = default
+
+
+def bench_thresholds() -> None:
+    """Build every fragmentsanity threshold table and check them against the clears documented on the option."""
+    from ..Locations import FRAGMENT_INCREMENTS, fragment_thresholds
+
+    documented = {3: (30, 110, 210, 310, 410), 4: (55, 210, 465, 820, 1275)}
+    for distribution, clears in documented.items():
+        table = fragment_thresholds(distribution, 1, 50)
+        assert tuple(table[check - 1] for check in (10, 20, 30, 40, 50)) == clears, f"{distribution=}"
+
+    fragment_thresholds.cache_clear()
+    start = time.perf_counter()
+    for distribution in FRAGMENT_INCREMENTS:
+        for rate in range(1, 11):
+            for quantity in range(1, 51):
+                fragment_thresholds(distribution, rate, quantity)
+    elapsed = time.perf_counter() - start
+    tables = fragment_thresholds.cache_info().currsize
+    print(f"{tables} threshold tables in {elapsed * 1e3:.2f} ms, documented clears match")
+
+
+def bench_slot_data(clients: int) -> None:
+    """Compare the JSON size of the compact slot data against the long key format the game mod reads today."""
+    import json
+
+    from ..slot_data import compact_slot_data, legacy_slot_data, read_slot_data, slot_data_values
+
+    options = dict(MAX_SANITY_OPTIONS, fragmentsanity_distribution="balanced_triangular")
+    multiworld = setup_haste_multiworld(1, options, 0, steps=("generate_early",))
+    values = slot_data_values(multiworld.worlds[1])
+    compact = compact_slot_data(values)
+    legacy = legacy_slot_data(values)
+
+    for label, slot_data in (("legacy", legacy), ("compact", compact)):
+        size = len(json.dumps(slot_data, separators=(",", ":")))
+        print(f"{label:<8} {size:>6} bytes per Connected, {size * clients / 1024:>8.1f} KiB for {clients} reconnects")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    import_parser = subparsers.add_parser("import", help="import-time cost of the world")
+    import_parser.add_argument("--runs", type=int, default=10)
+    import_parser.add_argument("--baseline", default="main",
+                               help="git revision of the world to compare against, empty to only time the current tree")
+
+    layout_parser = subparsers.add_parser("layout", help="region/location layout cache")
+    layout_parser.add_argument("--slots", type=int, default=100)
+
+    gating_parser = subparsers.add_parser("gating", help="segment events vs Shard gating at max sanity")
+    gating_parser.add_argument("--seeds", type=int, default=5)
+    gating_parser.add_argument("--players", type=int, default=1)
+
+    reachability_parser = subparsers.add_parser("reachability", help="update_reachable_regions with many Haste slots")
+    reachability_parser.add_argument("--players", type=int, default=50)
+    reachability_parser.add_argument("--seed", type=int, default=0)
+    reachability_parser.add_argument("--repeats", type=int, default=3)
+
+    rules_parser = subparsers.add_parser("rules", help="compiled location rules vs the rule table")
+    rules_parser.add_argument("--states", type=int, default=200)
+    rules_parser.add_argument("--seed", type=int, default=0)
+
+    filler_parser = subparsers.add_parser("filler", help="per-item vs batched filler generation")
+    filler_parser.add_argument("--count", type=int, default=500)
+    filler_parser.add_argument("--seed", type=int, default=0)
+
+    pool_parser = subparsers.add_parser("pool", help="item quantity tables over the option matrix")
+    pool_parser.add_argument("--rounds", type=int, default=10)
+
+    items_parser = subparsers.add_parser("items", help="bulk item creation")
+    items_parser.add_argument("--count", type=int, default=5000)
+    items_parser.add_argument("--seed", type=int, default=0)
+
+    concurrency_parser = subparsers.add_parser("concurrency", help="check generations don't share world state")
+    concurrency_parser.add_argument("--seeds", type=int, default=8)
+    concurrency_parser.add_argument("--players", type=int, default=4)
+
+    spheres_parser = subparsers.add_parser("spheres", help="count-based reachability vs CollectionState")
+    spheres_parser.add_argument("--states", type=int, default=200)
+    spheres_parser.add_argument("--seed", type=int, default=0)
+
+    exclusion_parser = subparsers.add_parser("exclusion", help="fill candidates, time and swaps by progression_check_limit")
+    exclusion_parser.add_argument("--limits", type=int, nargs="+", default=[0, 15, 5])
+    exclusion_parser.add_argument("--seeds", type=int, default=5)
+    exclusion_parser.add_argument("--players", type=int, default=1)
+
+    prefill_parser = subparsers.add_parser("prefill", help="restrictive slots with and without the Shard pre-fill")
+    prefill_parser.add_argument("--seeds", type=int, default=20)
+    prefill_parser.add_argument("--players", type=int, default=1)
+
+    subparsers.add_parser("thresholds", help="fragmentsanity threshold tables")
+
+    slot_data_parser = subparsers.add_parser("slot_data", help="slot data size, compact vs legacy format")
+    slot_data_parser.add_argument("--clients", type=int, default=500)
+
+    args = parser.parse_args()
+    if args.benchmark == "import":
+        bench_import(args.runs, args.baseline)
+    elif args.benchmark == "layout":
+        bench_layout(args.slots)
+    elif args.benchmark == "gating":
+        bench_gating(args.seeds, args.players)
+    elif args.benchmark == "reachability":
+        bench_reachability(args.players, args.seed, args.repeats)
+    elif args.benchmark == "rules":
+        bench_rules(args.states, args.seed)
+    elif args.benchmark == "filler":
+        bench_filler(args.count, args.seed)
+    elif args.benchmark == "pool":
+        bench_pool(args.rounds)
+    elif args.benchmark == "items":
+        bench_items(args.count, args.seed)
+    elif args.benchmark == "concurrency":
+        check_concurrency(args.seeds, args.players)
+    elif args.benchmark == "spheres":
+        bench_spheres(args.states, args.seed)
+    elif args.benchmark == "exclusion":
+        bench_exclusion(args.limits, args.seeds, args.players)
+    elif args.benchmark == "prefill":
+        bench_prefill(args.seeds, args.players)
+    elif args.benchmark == "thresholds":
+        bench_thresholds()
+    elif args.benchmark == "slot_data":
+        bench_slot_data(args.clients)
+
+
+if __name__ == "__main__":
+    main()
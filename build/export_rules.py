@@ -0,0 +1,50 @@
+"""
+Export the Haste rules for a set of options as JSON, for trackers.
+
+Run from the root of an Archipelago checkout with the world installed in `worlds/`, eg:
+    python -m worlds.haste.build.export_rules shopsanity=global npc_shuffle=true --out haste_rules.json
+
+Options not given keep their defaults. See `rule_table.export_rule_table` for the format.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any
+
+
+def parse_options(pairs: list[str]) -> Any:
+    """Build HasteOptions from `option_name=value` pairs, the values are read like yaml values."""
+    from ..options import HasteOptions
+
+    values: dict[str, str] = {}
+    for pair in pairs:
+        name, separator, value = pair.partition("=")
+        if not separator or name not in HasteOptions.type_hints:
+            raise SystemExit(f"Expected option_name=value with a Haste option, got {pair!r}")
+        values[name] = value
+
+    return HasteOptions(**{
+        name: option.from_any(values.get(name, option.default)) for name, option in HasteOptions.type_hints.items()
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("options", nargs="*", help="option_name=value pairs")
+    parser.add_argument("--out", default=None, help="file to write, defaults to stdout")
+    args = parser.parse_args()
+
+    from ..rule_table import export_rule_table
+
+    rules = export_rule_table(parse_options(args.options))
+    if args.out is None:
+        json.dump(rules, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as file:
+            json.dump(rules, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
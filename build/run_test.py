@@ -4,7 +4,7 @@ import pytest  # type: ignore
 # This will create host.yaml and custom worlds folder as it uses relative paths
 def main():
     test_directories = [
-        "worlds\\twilight_princess_apworld\\tests",
+        "worlds\\haste\\tests",
         "test\\general",
         "test\\multiworld",
         # "test",
@@ -0,0 +1,188 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, TypeVar
+
+from BaseClasses import ItemClassification as IC
+
+# Set to a directory to profile every Haste slot's generation stages and write a JSON report per slot into it.
+# Read once at import, so with it unset the stages are left completely unwrapped.
+PROFILE_DIR: Optional[str] = os.environ.get("HASTE_PROFILE_DIR") or None
+
+# Set as well as HASTE_PROFILE_DIR to count every call of the compiled access rules, which slows fill down.
+PROFILE_RULES: bool = PROFILE_DIR is not None and bool(os.environ.get("HASTE_PROFILE_RULES"))
+
+# Set as well as HASTE_PROFILE_DIR to measure each stage's memory with tracemalloc, which slows the stages down.
+PROFILE_MEMORY: bool = PROFILE_DIR is not None and bool(os.environ.get("HASTE_PROFILE_MEMORY"))
+
+StageMethod = TypeVar("StageMethod", bound=Callable[..., Any])
+
+
+class StageProfile:
+    """
+    Wall time and allocations of each generation stage of one world.
+
+    With HASTE_PROFILE_MEMORY set, memory is measured with tracemalloc while each stage runs. Tracing slows the stage
+    down, so its seconds are inflated, but it is stopped again afterwards, so fill and other slots run untraced.
+    tracemalloc traces the whole process, so stages of other slots or threads running at the same time are counted too.
+    Generate slots one at a time for exact per-slot numbers.
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, dict[str, float]] = {}
+
+    @contextmanager
+    def measure(self, stage: str):
+        # leave tracing alone if something else started it
+        tracing = PROFILE_MEMORY and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if PROFILE_MEMORY:
+            tracemalloc.reset_peak()
+            memory_before, _ = tracemalloc.get_traced_memory()
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            measured = {
+                "seconds": elapsed,
+                "allocated_blocks": sys.getallocatedblocks() - blocks_before,
+            }
+            if PROFILE_MEMORY:
+                memory_after, memory_peak = tracemalloc.get_traced_memory()
+                measured["allocated_bytes"] = memory_after - memory_before
+                measured["peak_bytes"] = memory_peak - memory_before
+            if tracing:
+                tracemalloc.stop()
+            self.stages[stage] = measured
+
+
+class CountedRule:
+    """
+    An access rule that counts how often it is called, how often it passes and how long it takes.
+
+    :param rule: The compiled rule being counted.
+    :param label: What the rule requires, for the report.
+    """
+
+    __slots__ = ("rule", "label", "calls", "passed", "seconds")
+
+    def __init__(self, rule: Callable[[Any], bool], label: str) -> None:
+        self.rule = rule
+        self.label = label
+        self.calls = 0
+        self.passed = 0
+        self.seconds = 0.0
+
+    def __call__(self, state) -> bool:
+        start = time.perf_counter()
+        result = self.rule(state)
+        self.seconds += time.perf_counter() - start
+        self.calls += 1
+        self.passed += result
+        return result
+
+
+def count_rules(world) -> list[dict[str, Any]]:
+    """Call counts and time of every counted rule of a world, slowest first."""
+    rules = [rule for rule in world.haste_rules.compiled.values() if isinstance(rule, CountedRule)]
+    return [
+        {
+            "rule": rule.label,
+            "calls": rule.calls,
+            "passed": rule.passed,
+            "seconds": rule.seconds,
+            "mean_us": rule.seconds / rule.calls * 1e6 if rule.calls else 0.0,
+        }
+        for rule in sorted(rules, key=lambda rule: rule.seconds, reverse=True)
+    ]
+
+
+def write_rule_report(world) -> str:
+    """Write a world's rule counts to PROFILE_DIR, returning the report's path."""
+    assert PROFILE_DIR is not None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"haste_{world.multiworld.seed}_P{world.player}_rules.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"seed": world.multiworld.seed, "player": world.player, "rules": count_rules(world)}, file, indent=2)
+    return path
+
+
+def watch_rules(world) -> None:
+    """
+    Write the world's rule report when the process exits, so rule calls made after the last stage are counted too
+    (eg. the spoiler playthrough). This keeps the world alive until then.
+    """
+    atexit.register(write_rule_report, world)
+
+
+def count_objects(world) -> dict[str, int]:
+    """Count what a world has created so far, for the profile report."""
+    multiworld = world.multiworld
+    regions = multiworld.get_regions(world.player)
+    rules = getattr(world, "haste_rules", None)
+    return {
+        "regions": len(regions),
+        "entrances": sum(len(region.exits) for region in regions),
+        "locations": len(world.haste_locations),
+        "event_locations": world.location_counts.events,
+        "rule_closures": 0 if rules is None else sum(rule is not None for rule in rules.compiled.values()),
+        "filler_items": sum(
+            1 for item in multiworld.itempool
+            if item.player == world.player and not item.classification & (IC.progression | IC.useful)
+        ),
+    }
+
+
+def write_report(world) -> str:
+    """Write a world's stage profile and object counts to PROFILE_DIR, returning the report's path."""
+    assert PROFILE_DIR is not None and world.stage_profile is not None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"haste_{world.multiworld.seed}_P{world.player}.json")
+    report = {
+        "seed": world.multiworld.seed,
+        "player": world.player,
+        "player_name": world.player_name,
+        "options": {name: getattr(world.options, name).value for name in world.options_dataclass.type_hints},
+        # stage seconds include tracemalloc's overhead when memory was traced
+        "memory_traced": PROFILE_MEMORY,
+        "stages": world.stage_profile.stages,
+        "objects": count_objects(world),
+    }
+    if PROFILE_RULES:
+        # calls up to now, write_rule_report has the final numbers
+        report["rules"] = count_rules(world)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, default=str)
+    return path
+
+
+def profiled_stage(report: bool = False) -> Callable[[StageMethod], StageMethod]:
+    """
+    Profile a HasteWorld generation stage into the world's stage_profile when HASTE_PROFILE_DIR is set.
+
+    :param report: Write the slot's report once this stage is done, for the last stage of generation.
+    """
+
+    def decorator(method: StageMethod) -> StageMethod:
+        if PROFILE_DIR is None:
+            return method
+
+        @functools.wraps(method)
+        def wrapper(world, *args, **kwargs):
+            with world.stage_profile.measure(method.__name__):
+                result = method(world, *args, **kwargs)
+            if report:
+                write_report(world)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
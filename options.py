@@ -9,6 +9,7 @@ from Options import (
     StartInventoryPool,
     Toggle,
     DefaultOnToggle,
+    NamedRange,
     Range,
 )
 from worlds.AutoWorld import World
@@ -82,6 +83,9 @@ class ShopsanitySeperateRate(Range):
 class ShardGoal(Range):
     """
     Determines which Shard will be the one that contains your victory condition.
+    If your progression items take up at least half of the locations that can hold them (eg. a low Shard Goal with few
+    Shopsanity/Fragmentsanity checks or a low Progression Check Limit), the items needed to reach the Shard Goal are
+    placed in your own world, in early locations where possible.
     """
 
     display_name = "Shard Goal"
@@ -181,6 +185,24 @@ class LinearFragmentsanityRate(Range):
     range_end = 10
     default = 1
 
+class ProgressionCheckLimit(NamedRange):
+    """
+    Limits how deep into Shopsanity and Fragmentsanity progression can be found.
+    Shop purchases and Fragment clears past this number (within each Shard for Per-Shard, overall for Global) will only contain filler items.
+    0 means there is no limit.
+    """
+
+    display_name = "Progression Check Limit"
+    range_start = 0
+    range_end = 100
+    default = 0
+    special_range_names = {
+        "disabled": 0,
+        "relaxed": 15,
+        "strict": 5,
+    }
+
+
 class StartingAbility(Choice):
     """
     Determines what ability you start with, with the remaining abilities being added into the item pool.
@@ -471,6 +493,7 @@ class HasteOptions(PerGameCommonOptions):
     pershard_fragmentsanity_quantity: PerShardFragmentQuantity
     global_fragmentsanity_quantity: GlobalFragmentQuantity
     fragmentsanity_linear_rate: LinearFragmentsanityRate
+    progression_check_limit: ProgressionCheckLimit
     starting_ability: StartingAbility
     permanent_items: PersistentItems
     permanent_item_quantities: PersistentItemQuantity
@@ -512,6 +535,7 @@ haste_option_groups: list[OptionGroup] = [
             LinearFragmentsanityRate,
             PerShardFragmentQuantity,
             GlobalFragmentQuantity,
+            ProgressionCheckLimit,
             # SRankBonus
         ],
         start_collapsed=False,
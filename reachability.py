@@ -0,0 +1,124 @@
+from collections import Counter
+from collections.abc import Mapping
+from typing import NamedTuple, Optional
+
+from BaseClasses import CollectionState
+from .Locations import location_layout
+from .Regions import HasteLayoutKey, layout_key
+from .rule_table import HasteRequirement, HasteRules, location_shard
+
+
+class Threshold(NamedTuple):
+    """
+    Everything a location needs, its Shard's entrance included: at least count of each item in counts, and one item
+    of every group in any_of.
+    """
+
+    counts: tuple[tuple[str, int], ...]
+    any_of: tuple[tuple[str, ...], ...]
+
+    def met_by(self, inventory: Mapping[str, int]) -> bool:
+        return all(inventory.get(item, 0) >= count for item, count in self.counts) and \
+            all(any(inventory.get(item, 0) for item in group) for group in self.any_of)
+
+    @property
+    def size(self) -> int:
+        """How many items the threshold needs at the least, to order locations from the least demanding."""
+        return sum(count for _, count in self.counts) + len(self.any_of)
+
+
+def combine_requirements(*requirements: HasteRequirement) -> Threshold:
+    counts: dict[str, int] = {}
+    any_of: set[tuple[str, ...]] = set()
+    for requirement in requirements:
+        for item, count in requirement.counts:
+            counts[item] = max(counts.get(item, 0), count)
+        if requirement.any_of:
+            any_of.add(requirement.any_of)
+    return Threshold(tuple(sorted(counts.items())), tuple(sorted(any_of)))
+
+
+class HasteReachability:
+    """
+    Works out which Haste locations an inventory can reach straight from item counts, without sweeping regions.
+
+    Every Haste entrance hangs off the menu or off a region that is reachable exactly when its Shard is (segment unlock
+    events are collectable as soon as their Shard is), so each location reduces to one combined Threshold. Locations
+    sharing a threshold are checked together, which leaves a few dozen count comparisons per query.
+    """
+
+    def __init__(self, rules: HasteRules, key: HasteLayoutKey):
+        groups: dict[Threshold, list[str]] = {}
+        for location in location_layout(key):
+            if location.data is None:
+                continue
+            requirements = [rules.location_requirement(location.name, location.data)]
+            shard = location_shard(location)
+            if shard is not None:
+                requirements.append(rules.shard_requirement(shard))
+            groups.setdefault(combine_requirements(*requirements), []).append(location.name)
+        self.groups: tuple[tuple[Threshold, tuple[str, ...]], ...] = tuple(
+            (threshold, tuple(names)) for threshold, names in groups.items()
+        )
+
+    @classmethod
+    def for_world(cls, world) -> "HasteReachability":
+        return cls(world.haste_rules, layout_key(world.options))
+
+    def reachable(self, inventory: Mapping[str, int]) -> list[str]:
+        """The locations reachable with `inventory`, a mapping of item names to how many of them are held."""
+        get = inventory.get
+        reachable: list[str] = []
+        for (counts, any_of), names in self.groups:
+            if all(get(item, 0) >= count for item, count in counts) and \
+                    all(any(get(item, 0) for item in group) for group in any_of):
+                reachable.extend(names)
+        return reachable
+
+    def spheres(self, placements: Mapping[str, str], inventory: Optional[Mapping[str, int]] = None) -> list[list[str]]:
+        """
+        Split the locations into spheres, collecting the items placed at them as they become reachable.
+
+        :param placements: Location names mapped to the names of the items for this player found there.
+            Items for other players (and anything they'd unlock) aren't followed.
+        :param inventory: What is held from the start, eg. the starting inventory.
+        :return: The locations that first become reachable in each sphere, in order.
+        """
+        counts = Counter(inventory or {})
+        found: set[str] = set()
+        spheres: list[list[str]] = []
+        while True:
+            sphere = [name for name in self.reachable(counts) if name not in found]
+            if not sphere:
+                return spheres
+            found.update(sphere)
+            spheres.append(sphere)
+            for name in sphere:
+                item = placements.get(name)
+                if item is not None:
+                    counts[item] += 1
+
+
+def cross_check(world, state: CollectionState) -> tuple[set[str], set[str]]:
+    """
+    Compare the reachable Haste locations of a world against CollectionState for the same items.
+
+    Segment unlock events are swept on a copy of the state first, as a generic sweep would.
+
+    :return: The locations only the fast calculator reaches, and the ones only CollectionState reaches.
+    """
+    player = world.player
+    state = state.copy()
+    events = [location for location in world.haste_locations.values() if location.address is None]
+    while True:
+        new_events = [location for location in events
+                      if not state.has(location.item.name, player) and location.can_reach(state)]
+        if not new_events:
+            break
+        for location in new_events:
+            state.collect(location.item, True, location)
+
+    fast = set(HasteReachability.for_world(world).reachable(state.prog_items[player]))
+    generic = {location.name for location in world.haste_locations.values()
+               if location.address is not None and location.can_reach(state)}
+    return fast - generic, generic - fast
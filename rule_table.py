@@ -0,0 +1,233 @@
+from typing import Callable, NamedTuple, Optional, Union
+
+from BaseClasses import CollectionState
+from .instrumentation import PROFILE_RULES, CountedRule, watch_rules
+from .Locations import COSTUME_SHARDS, HasteFlag, HasteLocationData, LayoutLocation, location_layout
+from .Regions import HasteLayoutKey, layout_key, region_layout
+from .options import HasteOptions, StartingAbility
+
+
+class Term(NamedTuple):
+    """
+    One item requirement in the rule table.
+
+    :param item: The item needed, or a tuple of items where any one of them will do.
+    :param count: How many are needed, or for relative terms how many more than the Shard number.
+    :param relative: Whether count is relative to the Shard the rule is for.
+    :param when: Space separated CONDITIONS keys, the term only applies while all of them hold.
+    :param min_shard: The term only applies to this Shard and later ones.
+    """
+
+    item: Union[str, tuple[str, ...]]
+    count: int = 1
+    relative: bool = False
+    when: Optional[str] = None
+    min_shard: int = 0
+
+
+# Option checks that terms can depend on
+CONDITIONS: dict[str, Callable[[HasteOptions], bool]] = {
+    "npc_shuffle": lambda options: bool(options.npc_shuffle),
+    "speed_upgrade": lambda options: bool(options.speed_upgrade),
+    "no_starting_ability": lambda options: options.starting_ability == StartingAbility.option_none,
+    "vanilla_fashion": lambda options: options.weeboh_purchases < 3,
+    # the starting ability is removed from the pool and doesn't need finding
+    "missing_sages_cowl": lambda options: options.starting_ability != StartingAbility.option_sages_cowl,
+    "missing_heirs_javelin": lambda options: options.starting_ability != StartingAbility.option_heirs_javelin,
+    "missing_wraiths_hourglass": lambda options: options.starting_ability != StartingAbility.option_wraiths_hourglass,
+}
+
+# Any of these abilities lets you logically do checks in Shard 5 and beyond
+ABILITY_ITEMS = ("Sage's Cowl", "Heir's Javelin", "Wraith's Hourglass")
+
+# What entering each Shard needs, speed upgrade terms are merged by taking the highest that applies
+SHARD_ENTRANCE_RULE: tuple[Term, ...] = (
+    Term("Progressive Shard", -1, relative=True),
+    Term("Progressive Speed Upgrade", 1, when="speed_upgrade", min_shard=3),
+    Term("Progressive Speed Upgrade", 2, when="speed_upgrade", min_shard=5),
+    Term("Progressive Speed Upgrade", 3, when="speed_upgrade", min_shard=7),
+    Term("Progressive Speed Upgrade", 4, when="speed_upgrade", min_shard=9),
+    Term(ABILITY_ITEMS, when="no_starting_ability", min_shard=5),
+)
+
+# What each kind of location needs once its region is reached, keyed by location flag and evaluated for the location's shard
+LOCATION_RULES: dict[HasteFlag, tuple[Term, ...]] = {
+    HasteFlag.Always: (Term("Progressive Shard", 1),),
+    HasteFlag.Boss: (Term("Progressive Shard", -1, relative=True),),
+    HasteFlag.CaptainsUpgrade: (Term("Progressive Shard", 1), Term("The Captain", when="npc_shuffle")),
+    HasteFlag.Fashion: (Term("Progressive Shard", 1), Term("Fashion Weeboh", when="npc_shuffle")),
+    HasteFlag.PerShardShop: (),
+    HasteFlag.GlobalShop: (),
+    HasteFlag.PerShardFragment: (),
+    HasteFlag.GlobalFragment: (),
+}
+
+# Extra terms for single locations on top of their flag's rule
+LOCATION_EXTRA_RULES: dict[str, tuple[Term, ...]] = {
+    "Wraith's Hourglass Purchase": (Term("Wraith", when="npc_shuffle"),),
+    "Heir's Javelin Purchase": (Term("Niada", when="npc_shuffle"),),
+    "Sage's Cowl Purchase": (Term("Daro", when="npc_shuffle"),),
+    # vanilla costume unlocks
+    "Costume Purchase: Weeboh": (Term("Progressive Shard", 4, when="vanilla_fashion"),),
+    "Costume Purchase: Flopsy": (Term("Progressive Shard", 6, when="vanilla_fashion"),),
+    "Costume Purchase: Totally Accurate Zoe": (
+        Term("Sage's Cowl", when="vanilla_fashion missing_sages_cowl"),
+        Term("Heir's Javelin", when="vanilla_fashion missing_heirs_javelin"),
+        Term("Wraith's Hourglass", when="vanilla_fashion missing_wraiths_hourglass"),
+    ),
+}
+
+
+class HasteRequirement(NamedTuple):
+    """
+    The items needed to pass a rule: every (item, count) in counts, plus one of any_of if it isn't empty.
+
+    An empty requirement is always met.
+    """
+
+    counts: tuple[tuple[str, int], ...] = ()
+    any_of: tuple[str, ...] = ()
+
+
+def resolve_terms(terms: tuple[Term, ...], options: HasteOptions, shard: Optional[int]) -> HasteRequirement:
+    """Evaluate rule table terms for one set of options and shard into a plain requirement."""
+    counts: dict[str, int] = {}
+    any_of: tuple[str, ...] = ()
+    for term in terms:
+        if term.when is not None and not all(CONDITIONS[condition](options) for condition in term.when.split()):
+            continue
+        if (shard or 0) < term.min_shard:
+            continue
+        if isinstance(term.item, tuple):
+            any_of = term.item
+            continue
+        count = (shard or 0) + term.count if term.relative else term.count
+        if count > 0:
+            counts[term.item] = max(counts.get(term.item, 0), count)
+    return HasteRequirement(tuple(sorted(counts.items())), any_of)
+
+
+def describe_requirement(requirement: HasteRequirement) -> str:
+    """A short readable form of a requirement, eg. for reports."""
+    parts = [f"{item} x{count}" for item, count in requirement.counts]
+    if requirement.any_of:
+        parts.append("any of " + " / ".join(requirement.any_of))
+    return " & ".join(parts) or "nothing"
+
+
+def compile_requirement(requirement: HasteRequirement, player: int) -> Optional[Callable[[CollectionState], bool]]:
+    """
+    Turn a requirement into the cheapest access rule that checks it.
+
+    Returns None for requirements that are always met, so the default rule can be kept.
+    """
+    counts, any_of = requirement
+    if len(counts) == 1:
+        (item, count), = counts
+        if not any_of:
+            return lambda state: state.has(item, player, count)
+        return lambda state: state.has(item, player, count) and state.has_any(any_of, player)
+    if len(counts) > 1:
+        item_counts = dict(counts)
+        if not any_of:
+            return lambda state: state.has_all_counts(item_counts, player)
+        return lambda state: state.has_all_counts(item_counts, player) and state.has_any(any_of, player)
+    if any_of:
+        return lambda state: state.has_any(any_of, player)
+    return None
+
+
+class HasteRules:
+    """
+    The rule table compiled for one world's options.
+
+    Identical requirements share one compiled rule, so every location with the same needs uses the same object.
+    With rule profiling on (see instrumentation.py), each compiled rule is wrapped in a CountedRule.
+    """
+
+    def __init__(self, options: HasteOptions, player: int, world=None):
+        self.options = options
+        self.player = player
+        self.compiled: dict[HasteRequirement, Optional[Callable[[CollectionState], bool]]] = {}
+        # location requirements only depend on the flag, the shard and whether the location has extra rules
+        self.location_requirements: dict[tuple[HasteFlag, Optional[int], Optional[str]], HasteRequirement] = {}
+        if PROFILE_RULES and world is not None:
+            watch_rules(world)
+
+    def shard_requirement(self, shard: int) -> HasteRequirement:
+        return resolve_terms(SHARD_ENTRANCE_RULE, self.options, shard)
+
+    def event_requirement(self, event: str) -> HasteRequirement:
+        return HasteRequirement(((event, 1),))
+
+    def location_requirement(self, location_name: str, data: HasteLocationData) -> HasteRequirement:
+        key = (data.flags, data.shard, location_name if location_name in LOCATION_EXTRA_RULES else None)
+        if key not in self.location_requirements:
+            terms = LOCATION_RULES.get(data.flags, ()) + LOCATION_EXTRA_RULES.get(location_name, ())
+            self.location_requirements[key] = resolve_terms(terms, self.options, data.shard)
+        return self.location_requirements[key]
+
+    def relevant_items(self, key: HasteLayoutKey) -> frozenset[str]:
+        """
+        Every item some rule of a layout reads, plus the victory item the completion condition checks.
+
+        Worked out from the layouts rather than the compiled rules, so it is ready before any region exists.
+        """
+        requirements: set[HasteRequirement] = set()
+        for region in region_layout(key):
+            if region.unlock is not None:
+                requirements.add(self.event_requirement(region.unlock))
+            else:
+                requirements.add(self.shard_requirement(region.shard))
+        for location in location_layout(key):
+            if location.data is not None:
+                requirements.add(self.location_requirement(location.name, location.data))
+
+        items = {"A New Future"}
+        for counts, any_of in requirements:
+            items.update(item for item, _ in counts)
+            items.update(any_of)
+        return frozenset(items)
+
+    def compile(self, requirement: HasteRequirement) -> Optional[Callable[[CollectionState], bool]]:
+        if requirement not in self.compiled:
+            rule = compile_requirement(requirement, self.player)
+            if PROFILE_RULES and rule is not None:
+                rule = CountedRule(rule, describe_requirement(requirement))
+            self.compiled[requirement] = rule
+        return self.compiled[requirement]
+
+
+def location_shard(location: LayoutLocation) -> Optional[int]:
+    """The Shard a laid out location logically sits in, or None for hub locations reachable from the start."""
+    if location.parent == "Menu":
+        return None
+    return location.data.shard if location.data.shard is not None else COSTUME_SHARDS[location.data.skin]
+
+
+def export_requirement(requirement: HasteRequirement) -> dict:
+    return {"all": dict(requirement.counts), "any": list(requirement.any_of)}
+
+
+def export_rule_table(options: HasteOptions) -> dict:
+    """
+    Export the rules for a set of options in a JSON-friendly form for trackers, written out by build/export_rules.py.
+
+    Shards map to what entering them needs, and locations map to the Shard they are in and what they need on top of it.
+    Requirements are {"all": {item: count}, "any": [items]}, where any one of "any" is needed if it isn't empty.
+    """
+    rules = HasteRules(options, 0)
+    key = layout_key(options)
+    return {
+        "shards": {
+            shard: export_requirement(rules.shard_requirement(shard)) for shard in range(1, key.shard_count + 1)
+        },
+        "locations": {
+            location.name: {
+                "shard": location_shard(location),
+                **export_requirement(rules.location_requirement(location.name, location.data)),
+            }
+            for location in location_layout(key)
+            if location.data is not None
+        },
+    }
@@ -0,0 +1,129 @@
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+# Bump whenever a key is added, removed or changes meaning in the compact format.
+SLOT_DATA_VERSION = 2
+# The original long key format, slot data without a "v" key is in it too
+LEGACY_SLOT_DATA_VERSION = 1
+
+# Released builds of the game mod only read the long keys, so those are what gets sent for now. Only turn this on
+# together with a mod release that reads the compact keys, bumping world_version, HasteWorld.version and
+# required_client_version so older installs can tell.
+# Until then the default payload is larger than before this schema existed rather than smaller: the long key format
+# also carries "Fragmentsanity Thresholds" (832 bytes of JSON for the default options against 766 without it, the
+# compact format is 295).
+COMPACT_SLOT_DATA = False
+
+
+class SlotDataField(NamedTuple):
+    """
+    One value in slot data.
+
+    :param key: The key in the compact format.
+    :param legacy_key: The key in the original long key format.
+    :param name: The HasteOptions attribute the value comes from, or what it's read back as for values that aren't options.
+    """
+
+    key: str
+    legacy_key: str
+    name: str
+
+
+SLOT_DATA_FIELDS: tuple[SlotDataField, ...] = (
+    SlotDataField("wv", "Version", "version"),
+    SlotDataField("dl", "DeathLink", "death_link"),
+    SlotDataField("fr", "ForceReload", "force_reload"),
+    SlotDataField("sg", "Shard Goal", "shard_goal"),
+    SlotDataField("suo", "Shard Unlock Order", "shard_unlock_order"),
+    SlotDataField("rpv", "Remove Post-Victory Locations", "remove_post_victory_locations"),
+    SlotDataField("esi", "Extra Shard Items", "extra_shard_items"),
+    SlotDataField("ss", "Shopsanity", "shopsanity"),
+    SlotDataField("ssq", "Per-Shard Shopsanity Quantity", "pershard_shopsanity_quantity"),
+    SlotDataField("sgq", "Global Shopsanity Quantity", "global_shopsanity_quantity"),
+    SlotDataField("sss", "Shopsanity Seperate", "shopsanity_seperate"),
+    SlotDataField("ssr", "Shopsanity Seperate Rate", "shopsanity_seperate_rate"),
+    SlotDataField("fs", "Fragmentsanity", "fragmentsanity"),
+    SlotDataField("fsd", "Fragmentsanity Distribution", "fragmentsanity_distribution"),
+    SlotDataField("fsq", "Per-Shard Fragmentsanity Quantity", "pershard_fragmentsanity_quantity"),
+    SlotDataField("fgq", "Global Fragmentsanity Quantity", "global_fragmentsanity_quantity"),
+    SlotDataField("flr", "Linear Fragmentsanity Rate", "fragmentsanity_linear_rate"),
+    SlotDataField("ft", "Fragmentsanity Thresholds", "fragment_thresholds"),
+    SlotDataField("npc", "NPC Shuffle", "npc_shuffle"),
+    SlotDataField("cu", "Captain's Upgrades", "captains_upgrades"),
+    SlotDataField("fw", "Fashion Weeboh's Purchases", "weeboh_purchases"),
+    SlotDataField("su", "Speed Upgrades", "speed_upgrade"),
+    SlotDataField("sa", "Starting Ability", "starting_ability"),
+    SlotDataField("pi", "Persistent Items", "permanent_items"),
+    SlotDataField("ob", "Default Outfit Body", "default_outfit_body"),
+    SlotDataField("oh", "Default Outfit Hat", "default_outfit_hat"),
+    SlotDataField("af", "Anti-Spark Filler", "antispark_filler"),
+    SlotDataField("dtw", "Disaster Trap Weight", "disaster_trap_weight"),
+    SlotDataField("ltw", "Landing Downgrade Trap Weight", "landing_trap_weight"),
+    SlotDataField("uai", "Unlock All Items", "unlock_all_items"),
+)
+
+# the original format sent this option twice, once under a misspelt key
+LEGACY_ALIASES = {"Remove Post-Victory Locations": "Remove Post-Victory Locaitons"}
+
+
+def slot_data_values(world) -> dict[str, Any]:
+    """A world's slot data values keyed by SlotDataField.name, as read_slot_data returns them."""
+    values = {"version": world.version, "fragment_thresholds": world.fragment_thresholds()}
+    return {
+        field.name: values[field.name] if field.name in values else getattr(world.options, field.name).value
+        for field in SLOT_DATA_FIELDS
+    }
+
+
+def compact_slot_data(values: Mapping[str, Any]) -> dict[str, Any]:
+    """Turn values from read_slot_data into the compact format."""
+    slot_data: dict[str, Any] = {"v": SLOT_DATA_VERSION}
+    for field in SLOT_DATA_FIELDS:
+        if field.name in values:
+            slot_data[field.key] = values[field.name]
+    return slot_data
+
+
+def build_slot_data(world) -> dict[str, Any]:
+    """Build a world's slot data in the format the game mod reads, see COMPACT_SLOT_DATA."""
+    values = slot_data_values(world)
+    if COMPACT_SLOT_DATA:
+        return compact_slot_data(values)
+    return legacy_slot_data(values)
+
+
+def read_slot_data(slot_data: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Read slot data in any format this world has sent, keyed by SlotDataField.name.
+
+    Values an older world didn't send are left out.
+
+    :raises ValueError: If the slot data is from a newer schema than this reader knows.
+    """
+    version = slot_data.get("v", LEGACY_SLOT_DATA_VERSION)
+    if version == LEGACY_SLOT_DATA_VERSION:
+        values: dict[str, Any] = {}
+        for field in SLOT_DATA_FIELDS:
+            for key in (field.legacy_key, LEGACY_ALIASES.get(field.legacy_key)):
+                if key is not None and key in slot_data:
+                    values[field.name] = slot_data[key]
+                    break
+        return values
+
+    if version > SLOT_DATA_VERSION:
+        raise ValueError(f"Slot data version {version} is newer than the supported {SLOT_DATA_VERSION}")
+    return {field.name: slot_data[field.key] for field in SLOT_DATA_FIELDS if field.key in slot_data}
+
+
+def legacy_slot_data(values: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Turn values from read_slot_data into the original long key format, for clients that still expect it.
+
+    No "v" is sent, slot data without one is read as this format.
+    """
+    slot_data: dict[str, Any] = {}
+    slot_data.update((field.legacy_key, values[field.name]) for field in SLOT_DATA_FIELDS if field.name in values)
+    for key, alias in LEGACY_ALIASES.items():
+        if key in slot_data:
+            slot_data[alias] = slot_data[key]
+    return slot_data
@@ -0,0 +1,5 @@
+from test.bases import WorldTestBase
+
+
+class HasteTestBase(WorldTestBase):
+    game = "Haste"
@@ -0,0 +1,61 @@
+from ..Locations import FRAGMENT_INCREMENTS, fragment_thresholds
+from ..options import FragmentsanityDistribution
+from ..slot_data import read_slot_data
+from . import HasteTestBase
+
+
+class TestFragmentThresholds(HasteTestBase):
+    options = {
+        "fragmentsanity": "per_shard",
+        "pershard_fragmentsanity_quantity": 25,
+        "fragmentsanity_distribution": "linear",
+        "fragmentsanity_linear_rate": 3,
+    }
+
+    def test_documented_clears(self) -> None:
+        """The clears at every 10th check match the ones listed on FragmentsanityDistribution."""
+        documented = {
+            FragmentsanityDistribution.option_balanced_triangular: (30, 110, 210, 310, 410),
+            FragmentsanityDistribution.option_triangular: (55, 210, 465, 820, 1275),
+        }
+        for distribution, clears in documented.items():
+            with self.subTest(distribution=distribution):
+                thresholds = fragment_thresholds(distribution, 1, 50)
+                self.assertEqual(tuple(thresholds[check - 1] for check in (10, 20, 30, 40, 50)), clears)
+
+    def test_thresholds_increase(self) -> None:
+        for distribution in FRAGMENT_INCREMENTS:
+            for rate in (1, 5, 10):
+                with self.subTest(distribution=distribution, rate=rate):
+                    thresholds = fragment_thresholds(distribution, rate, 50)
+                    self.assertEqual(len(thresholds), 50)
+                    self.assertTrue(all(a < b for a, b in zip((0,) + thresholds, thresholds)))
+
+    def test_slot_thresholds(self) -> None:
+        self.assertEqual(self.world.fragment_thresholds(), [3 * check for check in range(1, 26)])
+        slot_data = read_slot_data(self.world.fill_slot_data())
+        self.assertEqual(slot_data["fragment_thresholds"], self.world.fragment_thresholds())
+
+
+class TestFragmentThresholdsGlobal(HasteTestBase):
+    options = {
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 50,
+        "fragmentsanity_distribution": "balanced_triangular",
+    }
+
+    def test_slot_thresholds(self) -> None:
+        self.assertEqual(
+            self.world.fragment_thresholds(),
+            list(fragment_thresholds(FragmentsanityDistribution.option_balanced_triangular, 1, 50)),
+        )
+
+
+class TestFragmentThresholdsOff(HasteTestBase):
+    options = {
+        "fragmentsanity": "off",
+        "shopsanity": "per_shard",
+    }
+
+    def test_no_thresholds(self) -> None:
+        self.assertEqual(self.world.fragment_thresholds(), [])
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+from unittest import mock
+
+from BaseClasses import CollectionState
+from .. import instrumentation, rule_table
+from ..instrumentation import CountedRule, StageProfile, count_rules, profiled_stage
+from ..rule_table import HasteRules, describe_requirement
+from . import HasteTestBase
+
+
+class TestStageProfiling(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "fragmentsanity": "global",
+    }
+
+    def test_off_by_default(self) -> None:
+        """Without HASTE_PROFILE_DIR stages are left unwrapped and nothing is kept on the world."""
+        def stage(world) -> None:
+            pass
+
+        with mock.patch.object(instrumentation, "PROFILE_DIR", None):
+            self.assertIs(profiled_stage()(stage), stage)
+        if instrumentation.PROFILE_DIR is None:
+            self.assertIsNone(self.world.stage_profile)
+
+    def test_stage_measured(self) -> None:
+        profile = StageProfile()
+        with profile.measure("create_items"):
+            [object() for _ in range(100)]
+        self.assertEqual(set(profile.stages), {"create_items"})
+        self.assertGreaterEqual(profile.stages["create_items"]["seconds"], 0)
+        self.assertIn("allocated_blocks", profile.stages["create_items"])
+
+    def test_memory_traced_only_during_stage(self) -> None:
+        if tracemalloc.is_tracing():
+            self.skipTest("something else is tracing memory")
+        profile = StageProfile()
+        with mock.patch.object(instrumentation, "PROFILE_MEMORY", True):
+            with profile.measure("set_rules"):
+                self.assertTrue(tracemalloc.is_tracing())
+                kept = [bytearray(1000) for _ in range(100)]
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreaterEqual(profile.stages["set_rules"]["peak_bytes"], 100 * 1000)
+        del kept
+
+    def test_report_written(self) -> None:
+        """The last stage writes a JSON report of every stage and the objects the slot created."""
+        def fill_slot_data(world) -> dict:
+            return {}
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(instrumentation, "PROFILE_DIR", directory), \
+                mock.patch.object(self.world, "stage_profile", StageProfile()):
+            profiled_stage(report=True)(fill_slot_data)(self.world)
+            path = os.path.join(directory, f"haste_{self.multiworld.seed}_P{self.player}.json")
+            with open(path, encoding="utf-8") as file:
+                report = json.load(file)
+        self.assertEqual(report["player"], self.player)
+        self.assertEqual(set(report["stages"]), {"fill_slot_data"})
+        objects = report["objects"]
+        self.assertEqual(objects["locations"], len(self.world.haste_locations))
+        self.assertEqual(objects["event_locations"], self.world.location_counts.events)
+        self.assertEqual(objects["regions"], len(self.multiworld.get_regions(self.player)))
+        self.assertGreater(objects["rule_closures"], 0)
+
+
+class TestRuleCounting(HasteTestBase):
+    def test_compiled_rules_counted(self) -> None:
+        """With rule profiling on, compiled rules are shared CountedRules that count calls and passes."""
+        with mock.patch.object(rule_table, "PROFILE_RULES", True):
+            rules = HasteRules(self.world.options, self.player)
+            requirement = rules.shard_requirement(3)
+            rule = rules.compile(requirement)
+            self.assertIsInstance(rule, CountedRule)
+            self.assertIs(rules.compile(requirement), rule)
+            self.assertIsNone(rules.compile(rules.shard_requirement(1)))
+
+        state = CollectionState(self.multiworld)
+        self.assertFalse(rule(state))
+        for _ in range(2):
+            state.collect(self.world.create_item("Progressive Shard"), True)
+        self.assertTrue(rule(state))
+        self.assertTrue(rule(state))
+
+        report, = count_rules(SimpleNamespace(haste_rules=rules))
+        self.assertEqual(report["rule"], describe_requirement(requirement))
+        self.assertEqual((report["calls"], report["passed"]), (3, 2))
+        self.assertGreaterEqual(report["seconds"], 0)
+
+    def test_plain_rules_by_default(self) -> None:
+        if rule_table.PROFILE_RULES:
+            self.skipTest("HASTE_PROFILE_RULES is set")
+        rule = self.world.haste_rules.compile(self.world.haste_rules.shard_requirement(3))
+        self.assertNotIsInstance(rule, CountedRule)
@@ -0,0 +1,28 @@
+from BaseClasses import CollectionState
+from . import HasteTestBase
+
+
+class TestItemLinks(HasteTestBase):
+    options = {
+        "shopsanity": "global",
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+    }
+
+    def test_group_collects_progression(self) -> None:
+        """Item link groups never run generate_early, they still have to collect the linked progression."""
+        group_id, _ = self.multiworld.add_group("Haste Link", self.game, {self.player})
+        group = self.multiworld.worlds[group_id]
+        state = CollectionState(self.multiworld)
+        for name in ("Progressive Shard", "Progressive Speed Upgrade", "The Captain"):
+            item = group.create_item(name)
+            self.assertEqual(group.collect_item(state, item), name)
+            state.collect(item, True)
+            # the rule Archipelago gives the "Item Link" event locations
+            self.assertTrue(state.has(name, group_id))
+
+    def test_slot_skips_irrelevant_items(self) -> None:
+        """A generated slot only collects the progression its rules read, Captain's Upgrades are off here."""
+        state = CollectionState(self.multiworld)
+        self.assertEqual(self.world.collect_item(state, self.world.create_item("Progressive Shard")), "Progressive Shard")
+        self.assertIsNone(self.world.collect_item(state, self.world.create_item("The Captain")))
@@ -0,0 +1,141 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from BaseClasses import ItemClassification
+from Options import OptionError
+from .. import HasteWorld
+from ..Itempool import PERM_ITEM_KEYS, UPGRADE_QUANTITIES, item_quantity_table, pool_key
+from ..Items import PersistentQuantities
+from . import HasteTestBase
+
+
+class TestItemPool(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 25,
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "captains_upgrades": True,
+        "extra_shard_items": 2,
+        "starting_ability": "sages_cowl",
+    }
+    expected = {
+        "Progressive Shard": 11,
+        "Progressive Speed Upgrade": 6,
+        "Wraith": 1,
+        "Niada": 1,
+        "Daro": 1,
+        "The Captain": 1,
+        "Fashion Weeboh": 1,
+        "Courier's Board": 1,
+        "Wraith's Hourglass": 1,
+        "Heir's Javelin": 1,
+        "Sage's Cowl": 0,
+        **UPGRADE_QUANTITIES,
+    }
+
+    def slot_items(self) -> Counter:
+        """Every item the slot created for the pool, placed by pre_fill or not."""
+        items = Counter(item.name for item in self.multiworld.itempool if item.player == self.player)
+        for location in self.world.haste_locations.values():
+            if location.address is not None and location.item is not None and location.item.name != "A New Future":
+                items[location.item.name] += 1
+        return items
+
+    def test_quantities(self) -> None:
+        items = self.slot_items()
+        for name, quantity in self.expected.items():
+            with self.subTest(name):
+                self.assertEqual(items[name], quantity)
+
+    def test_table_shared(self) -> None:
+        """Slots with the same pool options share one cached quantity table."""
+        key = pool_key(self.world)
+        hits = item_quantity_table.cache_info().hits
+        self.assertIs(item_quantity_table(key), item_quantity_table(pool_key(self.world)))
+        self.assertGreater(item_quantity_table.cache_info().hits, hits)
+
+    def test_capacity_matches_pool(self) -> None:
+        """The capacity generate_early checks counts exactly the locations and progression create_items makes."""
+        capacity = self.world.haste_capacity
+        # the pool sorts by the table's classification, which can demote an NPC with no checks
+        table = item_quantity_table(pool_key(self.world))
+        progression = sum(
+            count for name, count in self.slot_items().items()
+            if name in table and table[name][1] & ItemClassification.progression
+        )
+        self.assertEqual(capacity.locations, self.world.location_counts.placeable)
+        self.assertEqual(capacity.progression, progression)
+        self.assertLessEqual(capacity.required, capacity.locations)
+
+
+class TestItemPoolNoStartingAbility(TestItemPool):
+    options = {
+        "shard_goal": 5,
+        "remove_post_victory_locations": True,
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 25,
+        "starting_ability": "none",
+    }
+    expected = {
+        "Progressive Shard": 4,
+        "Progressive Speed Upgrade": 0,
+        "Wraith": 0,
+        "The Captain": 0,
+        "Courier's Board": 1,
+        "Wraith's Hourglass": 1,
+        "Heir's Javelin": 1,
+        "Sage's Cowl": 1,
+        **dict.fromkeys(UPGRADE_QUANTITIES, 0),
+    }
+
+
+class TestInsufficientLocations(HasteTestBase):
+    def test_refused_in_generate_early(self) -> None:
+        """More required items than locations is refused by the capacity check, before regions are created."""
+        options = self.world.options
+        options.shard_goal.value = 10
+        options.remove_post_victory_locations.value = False
+        options.shopsanity.value = options.shopsanity.option_global
+        options.global_shopsanity_quantity.value = 5
+        options.fragmentsanity.value = options.fragmentsanity.option_off
+        options.npc_shuffle.value = True
+        options.speed_upgrade.value = True
+        with self.assertRaisesRegex(OptionError, "Insufficient locations"):
+            self.world.generate_early()
+
+
+class TestPersistentQuantities(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 25,
+        "permanent_items": "on",
+        "permanent_item_quantities": {"common_speed": 3, "legendary": "2-2", "epic_health": "random"},
+    }
+
+    def test_parsed_per_world(self) -> None:
+        """The rolled quantities live on the world as an immutable value, nothing is written to the class."""
+        quantities = self.world.perm_quantities
+        self.assertEqual((quantities.common_speed, quantities.legendary, quantities.rare_speed), (3, 2, 0))
+        self.assertIn(quantities.epic_health, range(1, 11))
+        self.assertNotIn("perm_quantities", vars(HasteWorld))
+        with self.assertRaises(AttributeError):
+            quantities.common_speed = 5
+
+    def test_pool_uses_quantities(self) -> None:
+        items = Counter(item.name for item in self.multiworld.itempool if item.player == self.player)
+        for item, field in PERM_ITEM_KEYS.items():
+            with self.subTest(item):
+                self.assertEqual(items[item], getattr(self.world.perm_quantities, field))
+
+    def test_concurrent_tables(self) -> None:
+        """Tables for different quantities built on several threads at once never see each other's values."""
+        key = pool_key(self.world)
+
+        def legendary_count(legendary: int) -> int:
+            table = item_quantity_table(key._replace(perm_quantities=PersistentQuantities(legendary=legendary)))
+            return table.get("Persistent Legendary Item", (0,))[0]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            counts = list(executor.map(legendary_count, [legendary % 11 for legendary in range(200)]))
+        self.assertEqual(counts, [legendary % 11 for legendary in range(200)])
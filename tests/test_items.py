@@ -0,0 +1,90 @@
+from random import Random
+
+from ..Items import ANTISPARK_BUNDLES, ITEM_TABLE, FillerSampler, HasteItem, filler_sampler, item_factory
+from . import HasteTestBase
+
+
+def alias_distribution(sampler: FillerSampler) -> dict[str, float]:
+    """The exact chance of every name the alias table gives, each column being picked 1/n of the time."""
+    size = len(sampler.names)
+    chances = dict.fromkeys(sampler.names, 0.0)
+    for column, (probability, alias) in enumerate(zip(sampler.probabilities, sampler.aliases)):
+        chances[sampler.names[column]] += probability / size
+        chances[sampler.names[alias]] += (1 - probability) / size
+    return chances
+
+
+class TestFillerSampler(HasteTestBase):
+    options = {
+        "disaster_trap_weight": 15,
+        "landing_trap_weight": 5,
+    }
+
+    def test_alias_table_matches_weights(self) -> None:
+        for weights in ((1, 0, 3), (5, 5, 5, 5), (1, 2, 3, 4, 5, 6, 100), (0, 0, 1)):
+            names = tuple(f"item {i}" for i in range(len(weights)))
+            chances = alias_distribution(FillerSampler(names, weights))
+            with self.subTest(weights=weights):
+                for name, weight in zip(names, weights):
+                    self.assertAlmostEqual(chances[name], weight / sum(weights), places=9)
+
+    def test_option_distribution(self) -> None:
+        """Trap weights are percentages of the filler and Sparks share out the rest."""
+        chances = alias_distribution(filler_sampler(15, 5, self.world.options.antispark_filler.value))
+        self.assertAlmostEqual(chances["Disaster Trap"], 0.15, places=9)
+        self.assertAlmostEqual(chances["Landing Downgrade Trap"], 0.05, places=9)
+        self.assertAlmostEqual(sum(chances[name] for name in ANTISPARK_BUNDLES), 0.8, places=9)
+
+    def test_zero_weight_never_drawn(self) -> None:
+        sampler = FillerSampler(("never", "always"), (0, 1))
+        self.assertEqual(set(sampler.sample(Random(0), 1000)), {"always"})
+
+    def test_sample_frequencies(self) -> None:
+        sampler = FillerSampler(("a", "b", "c"), (1, 0, 3))
+        drawn = sampler.sample(Random(0), 40000)
+        self.assertNotIn("b", drawn)
+        self.assertAlmostEqual(drawn.count("a") / len(drawn), 0.25, delta=0.01)
+
+    def test_same_seed_same_filler(self) -> None:
+        sampler = filler_sampler(15, 5, self.world.options.antispark_filler.value)
+        self.assertEqual(sampler.sample(Random(7), 200), sampler.sample(Random(7), 200))
+
+    def test_world_filler_from_sampler(self) -> None:
+        """Once the slot's useful and fixed filler items run out, filler comes from the option's sampler."""
+        sampler = filler_sampler(15, 5, self.world.options.antispark_filler.value)
+        leftover = len(self.world.useful_pool) + len(self.world.filler_pool)
+        names = self.world.get_filler_item_names(leftover + 50)
+        self.assertEqual(len(names), leftover + 50)
+        for name in names[leftover:]:
+            self.assertIn(name, sampler.names)
+
+
+class TestHasteItems(HasteTestBase):
+    options = {
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "captains_upgrades": True,
+    }
+
+    def test_items_are_slotted(self) -> None:
+        """Pool items carry no per-instance __dict__."""
+        item = self.world.create_item("Progressive Shard")
+        self.assertFalse(hasattr(item, "__dict__"))
+        with self.assertRaises(AttributeError):
+            item.unexpected = True
+
+    def test_bulk_items_match_create_item(self) -> None:
+        """Items made in bulk by item_factory are the same as ones made one at a time."""
+        names = list(ITEM_TABLE) * 2
+        for bulk in item_factory(names, self.world):
+            single = self.world.create_item(bulk.name)
+            with self.subTest(bulk.name):
+                self.assertIsInstance(bulk, HasteItem)
+                self.assertEqual(
+                    (bulk.name, bulk.classification, bulk.code, bulk.player, bulk.type),
+                    (single.name, single.classification, single.code, single.player, single.type),
+                )
+
+    def test_bulk_items_are_separate(self) -> None:
+        first, second = item_factory(["Progressive Shard", "Progressive Shard"], self.world)
+        self.assertIsNot(first, second)
@@ -0,0 +1,40 @@
+from ..Locations import location_layout
+from ..Regions import layout_key, region_layout
+from . import HasteTestBase
+
+
+class TestLayoutCache(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 12,
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 20,
+        "weeboh_purchases": "vanilla",
+    }
+
+    def test_layouts_shared(self) -> None:
+        """Slots with the same options get the cached region and location layouts back."""
+        key = layout_key(self.world.options)
+        for layout in (region_layout, location_layout):
+            with self.subTest(layout.__name__):
+                hits = layout.cache_info().hits
+                self.assertIs(layout(key), layout(layout_key(self.world.options)))
+                self.assertGreater(layout.cache_info().hits, hits)
+
+    def test_layout_per_options(self) -> None:
+        key = layout_key(self.world.options)
+        other = key._replace(shop_quantity=key.shop_quantity + 1)
+        self.assertEqual(len(location_layout(other)), len(location_layout(key)) + key.shard_count)
+
+    def test_world_built_from_layout(self) -> None:
+        """The slot's regions and locations are exactly the ones its layout lists."""
+        key = layout_key(self.world.options)
+        self.assertEqual([location.name for location in location_layout(key)], list(self.world.haste_locations))
+        for entry in location_layout(key):
+            location = self.world.haste_locations[entry.name]
+            with self.subTest(entry.name):
+                self.assertEqual(location.parent_region.name, entry.parent)
+                self.assertIn(location, self.multiworld.get_region(entry.region, self.player).locations)
+                self.assertEqual(location.address is None, entry.data is None)
+        regions = {region.name for region in self.multiworld.regions if region.player == self.player}
+        self.assertEqual(regions, {"Menu"} | {region.name for region in region_layout(key)})
@@ -0,0 +1,174 @@
+from BaseClasses import LocationProgressType
+from ..Locations import LOCATION_TABLE, HasteFlag, HasteLocation, get_location_catalog, get_location_plan
+from .. import HasteWorld
+from . import HasteTestBase
+
+
+class TestLocationCatalog(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "fragmentsanity": "per_shard",
+        "pershard_fragmentsanity_quantity": 10,
+    }
+
+    def test_matches_location_table(self) -> None:
+        """Every location id maps back to the flag, shard and ordinal LOCATION_TABLE has for it."""
+        catalog = get_location_catalog()
+        for name, data in LOCATION_TABLE.items():
+            location_id = HasteLocation.get_apid(data.code)
+            with self.subTest(name):
+                self.assertEqual(catalog.flag(location_id), data.flags)
+                self.assertEqual(catalog.shard(location_id), data.shard)
+                self.assertEqual(catalog.ordinal(location_id), data.ordinal)
+
+    def test_built_once(self) -> None:
+        self.assertIs(get_location_catalog(), get_location_catalog())
+        self.assertIs(get_location_plan(), get_location_plan())
+
+    def test_plan_covers_table(self) -> None:
+        """The location plan holds every LOCATION_TABLE entry once, under its flag and shard, in ordinal order."""
+        planned = []
+        for flag, shards in get_location_plan().items():
+            for shard, entries in shards.items():
+                for name, data in entries:
+                    self.assertEqual((data.flags, data.shard), (flag, shard))
+                planned += [name for name, _ in entries]
+                ordinals = [data.ordinal or 0 for _, data in entries]
+                self.assertEqual(ordinals, sorted(ordinals))
+        self.assertEqual(sorted(planned), sorted(LOCATION_TABLE))
+
+    def test_hint_text(self) -> None:
+        """Only fragment checks get extra hint text, the clears they need."""
+        hint_data: dict[int, dict[int, str]] = {}
+        self.world.extend_hint_information(hint_data)
+        thresholds = self.world.fragment_thresholds()
+        hints = hint_data[self.player]
+        for name, location in self.world.haste_locations.items():
+            if location.address is None:
+                continue
+            data = LOCATION_TABLE[name]
+            with self.subTest(name):
+                if data.flags == HasteFlag.PerShardFragment:
+                    self.assertEqual(hints[location.address], f"after {thresholds[data.ordinal - 1]} Fragment clears")
+                else:
+                    self.assertNotIn(location.address, hints)
+
+
+class TestCreateLocations(HasteTestBase):
+    options = {
+        "shard_goal": 6,
+        "remove_post_victory_locations": True,
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 7,
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 12,
+        "captains_upgrades": True,
+    }
+
+    def expected_names(self) -> set[str]:
+        """What a scan over the whole LOCATION_TABLE picks for the options, costumes aside."""
+        options = self.world.options
+        shards = options.shard_goal.value if options.remove_post_victory_locations else 10
+        enabled = {
+            HasteFlag.Always: (True, None, None),
+            HasteFlag.Boss: (True, shards, None),
+            HasteFlag.CaptainsUpgrade: (bool(options.captains_upgrades), None, None),
+            HasteFlag.PerShardShop: (
+                options.shopsanity == options.shopsanity.option_per_shard, shards,
+                options.pershard_shopsanity_quantity.value,
+            ),
+            HasteFlag.GlobalShop: (
+                options.shopsanity == options.shopsanity.option_global, None, options.global_shopsanity_quantity.value,
+            ),
+            HasteFlag.PerShardFragment: (
+                options.fragmentsanity == options.fragmentsanity.option_per_shard, shards,
+                options.pershard_fragmentsanity_quantity.value,
+            ),
+            HasteFlag.GlobalFragment: (
+                options.fragmentsanity == options.fragmentsanity.option_global, None,
+                options.global_fragmentsanity_quantity.value,
+            ),
+        }
+        names: set[str] = set()
+        for name, data in LOCATION_TABLE.items():
+            if data.flags not in enabled:
+                continue
+            on, max_shard, quantity = enabled[data.flags]
+            if on and (max_shard is None or data.shard <= max_shard) and (quantity is None or data.ordinal <= quantity):
+                names.add(name)
+        return names
+
+    def test_locations_match_table_scan(self) -> None:
+        """Creating locations from the location plan gives the same locations as scanning LOCATION_TABLE."""
+        created = {
+            name for name, location in self.world.haste_locations.items()
+            if location.address is not None and LOCATION_TABLE[name].flags != HasteFlag.Fashion
+        }
+        self.assertEqual(created, self.expected_names())
+
+    def test_every_location_in_multiworld(self) -> None:
+        slot_locations = {location.name for location in self.multiworld.get_locations(self.player)}
+        self.assertEqual(slot_locations, set(self.world.haste_locations))
+
+
+class TestCreateLocationsPerShardFragments(TestCreateLocations):
+    options = {
+        "shopsanity": "global",
+        "global_shopsanity_quantity": 40,
+        "fragmentsanity": "per_shard",
+        "pershard_fragmentsanity_quantity": 9,
+    }
+
+
+class TestLocationCounts(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 10,
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 30,
+        "progression_check_limit": 5,
+    }
+
+    def test_counts_match_multiworld(self) -> None:
+        """The counts kept while creating locations are what a scan of the multiworld finds."""
+        locations = self.multiworld.get_locations(self.player)
+        placeable = [location for location in locations if location.address is not None and location.item is None]
+        counts = self.world.location_counts
+        self.assertEqual(counts.placeable, len(placeable))
+        self.assertEqual(
+            counts.excluded, sum(location.progress_type == LocationProgressType.EXCLUDED for location in placeable)
+        )
+        self.assertEqual(counts.events, sum(location.address is None for location in locations))
+        self.assertGreater(counts.excluded, 0)
+
+    def test_pool_fills_placeable(self) -> None:
+        """The item pool is sized from the counts, one item for every empty location."""
+        items = [item for item in self.multiworld.itempool if item.player == self.player]
+        self.assertEqual(len(items), self.world.location_counts.placeable)
+
+
+class TestLocationNameGroups(HasteTestBase):
+    def test_groups_match_name_prefixes(self) -> None:
+        """Every group holds exactly the locations whose names say they belong to it."""
+        groups = HasteWorld.location_name_groups
+        expected = {
+            "Global Locations": "Global ",
+            "Global Shop": "Global Shop Item ",
+            "Global Fragments": "Global Fragment Clear ",
+            "Captain's Purchases": "Captain's ",
+            "Costume Purchases": "Costume Purchase:",
+        }
+        for shard in range(1, 11):
+            expected[f"Shard {shard}"] = f"Shard {shard} "
+            expected[f"Shard {shard} Shop"] = f"Shard {shard} Shop Item "
+            expected[f"Shard {shard} Fragments"] = f"Shard {shard} Fragment Clear "
+        for group, prefix in expected.items():
+            with self.subTest(group):
+                self.assertEqual(groups[group], {name for name in LOCATION_TABLE if name.startswith(prefix)})
+        self.assertEqual(
+            groups["Ability Purchases"],
+            {"Wraith's Hourglass Purchase", "Heir's Javelin Purchase", "Sage's Cowl Purchase"},
+        )
+        self.assertEqual(groups["Shard Bosses"], {f"Shard {shard} Boss" for shard in range(1, 11)})
+        self.assertEqual(groups["Shard 5 Costumes"], {"Costume Purchase: Weeboh"})
+        self.assertEqual(groups["Shard 7 Costumes"], {"Costume Purchase: Flopsy"})
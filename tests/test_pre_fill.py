@@ -0,0 +1,58 @@
+from unittest import mock
+
+from BaseClasses import LocationProgressType
+from .. import HasteWorld
+from . import HasteTestBase
+
+
+class TestPreFillRestrictive(HasteTestBase):
+    options = {
+        "shard_goal": 9,
+        "shopsanity": "per_shard",
+        "fragmentsanity": "off",
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "progression_check_limit": 2,
+    }
+
+    def test_pre_filled(self) -> None:
+        """Restrictive slots place their Shard gating items into the slot's own non-excluded locations."""
+        self.assertEqual(self.world.prefill_pool, [])
+        placed = [
+            location for location in self.world.haste_locations.values()
+            if location.address is not None and location.item is not None and location.item.name != "A New Future"
+        ]
+        self.assertTrue(placed)
+        for location in placed:
+            self.assertEqual(location.item.player, self.player)
+            self.assertNotEqual(location.progress_type, LocationProgressType.EXCLUDED)
+
+    def test_pool_matches_empty_locations(self) -> None:
+        """Whatever pre_fill couldn't place is back in the item pool, one item for every empty location."""
+        empty = [
+            location for location in self.world.haste_locations.values()
+            if location.address is not None and location.item is None
+        ]
+        items = [item for item in self.multiworld.itempool if item.player == self.player]
+        self.assertEqual(len(items), len(empty))
+        self.assertEqual(self.world.location_counts.placeable, len(empty))
+
+
+class TestPreFillNoStartingAbility(TestPreFillRestrictive):
+    options = {
+        "shard_goal": 10,
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 3,
+        "fragmentsanity": "off",
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "starting_ability": "none",
+    }
+
+
+class TestPreFillFallback(TestPreFillRestrictive):
+    """With no bounded candidates at all every item has to go through the fallback."""
+
+    def world_setup(self, *args, **kwargs) -> None:
+        with mock.patch(f"{HasteWorld.__module__}.prefill_candidate_names", return_value=[]):
+            super().world_setup(*args, **kwargs)
@@ -0,0 +1,54 @@
+from BaseClasses import LocationProgressType
+from Options import OptionError
+from ..Locations import LOCATION_TABLE, SANITY_FLAGS
+from . import HasteTestBase
+
+
+class TestProgressionCheckLimit(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 10,
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 30,
+        "progression_check_limit": 5,
+    }
+
+    def test_excluded_past_limit(self) -> None:
+        """Exactly the shop and fragment checks past the limit are excluded."""
+        limit = self.world.options.progression_check_limit.value
+        for name, location in self.world.haste_locations.items():
+            if location.address is None:
+                continue
+            data = LOCATION_TABLE[name]
+            past_limit = bool(limit) and data.flags in SANITY_FLAGS and data.ordinal > limit
+            with self.subTest(name):
+                self.assertEqual(location.progress_type == LocationProgressType.EXCLUDED, past_limit)
+                self.assertEqual(name in self.world.nonprogress_locations, past_limit)
+
+    def test_capacity_counts_excluded(self) -> None:
+        capacity = self.world.haste_capacity
+        self.assertEqual(capacity.excluded, self.world.location_counts.excluded)
+        self.assertLessEqual(capacity.required, capacity.locations - capacity.excluded)
+
+
+class TestProgressionCheckLimitOff(TestProgressionCheckLimit):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 10,
+        "fragmentsanity": "global",
+        "global_fragmentsanity_quantity": 30,
+    }
+
+
+class TestProgressionCheckLimitTooLow(HasteTestBase):
+    def test_too_few_progression_locations(self) -> None:
+        """A limit leaving fewer non-excluded locations than required items is refused in generate_early."""
+        options = self.world.options
+        options.shard_goal.value = 9
+        options.shopsanity.value = options.shopsanity.option_global
+        options.fragmentsanity.value = options.fragmentsanity.option_off
+        options.npc_shuffle.value = True
+        options.speed_upgrade.value = True
+        options.progression_check_limit.value = 2
+        with self.assertRaises(OptionError):
+            self.world.generate_early()
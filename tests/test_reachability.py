@@ -0,0 +1,162 @@
+from unittest import mock
+
+from BaseClasses import CollectionState
+from .. import Regions
+from ..Regions import layout_key
+from ..reachability import HasteReachability, cross_check
+from . import HasteTestBase
+
+
+class TestReachabilityDefault(HasteTestBase):
+    # random inventories to compare per options set
+    inventories = 50
+
+    def test_matches_collection_state(self) -> None:
+        """The count-based calculator reaches exactly the locations CollectionState does."""
+        items = [item for item in self.multiworld.itempool if item.player == self.player and item.advancement]
+        for _ in range(self.inventories):
+            state = CollectionState(self.multiworld)
+            for item in self.multiworld.random.sample(items, self.multiworld.random.randrange(len(items) + 1)):
+                state.collect(item, True)
+            only_fast, only_generic = cross_check(self.world, state)
+            self.assertFalse(only_fast, "reached by HasteReachability but not CollectionState")
+            self.assertFalse(only_generic, "reached by CollectionState but not HasteReachability")
+
+    def test_all_items_reach_everything(self) -> None:
+        locations = {name for name, location in self.world.haste_locations.items() if location.address is not None}
+        state = self.multiworld.get_all_state(False)
+        self.assertEqual(set(HasteReachability.for_world(self.world).reachable(state.prog_items[self.player])), locations)
+
+    def collection_state_spheres(self, placements: dict[str, str]) -> list[set[str]]:
+        """
+        Spheres the slow way, sweeping CollectionState one sphere at a time.
+
+        Events are collected as soon as they are reachable, as cross_check does, so segment unlocks never add a sphere.
+        """
+        state = CollectionState(self.multiworld)
+        events = [location for location in self.world.haste_locations.values() if location.address is None]
+        found: set[str] = set()
+        spheres: list[set[str]] = []
+        while True:
+            new_events = [location for location in events if location.name not in found and location.can_reach(state)]
+            if new_events:
+                for location in new_events:
+                    found.add(location.name)
+                    state.collect(location.item, True)
+                continue
+            sphere = [location for name, location in self.world.haste_locations.items()
+                      if name not in found and location.can_reach(state)]
+            if not sphere:
+                return spheres
+            found.update(location.name for location in sphere)
+            spheres.append({location.name for location in sphere})
+            for location in sphere:
+                item = placements.get(location.name)
+                if item is not None:
+                    state.collect(self.world.create_item(item), True)
+
+    def test_spheres_match_collection_state(self) -> None:
+        """Spheres for random placements of the slot's progression match a CollectionState sweep."""
+        items = [item.name for item in self.multiworld.itempool if item.player == self.player and item.advancement]
+        locations = [name for name, location in self.world.haste_locations.items() if location.address is not None]
+        reachability = HasteReachability.for_world(self.world)
+        for _ in range(self.inventories // 10):
+            placements = dict(zip(self.multiworld.random.sample(locations, len(items)), items))
+            spheres = [set(sphere) for sphere in reachability.spheres(placements)]
+            self.assertEqual(spheres, [sphere for sphere in self.collection_state_spheres(placements) if sphere])
+
+
+class TestReachabilityMaxSanity(TestReachabilityDefault):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 25,
+        "fragmentsanity": "per_shard",
+        "pershard_fragmentsanity_quantity": 25,
+        "captains_upgrades": True,
+        "weeboh_purchases": "all_unlocks",
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "starting_ability": "none",
+    }
+
+
+class TestReachabilitySegmentEvents(TestReachabilityMaxSanity):
+    """The same checks with shop and fragment segments in chained event-gated subregions."""
+
+    def world_setup(self, *args, **kwargs) -> None:
+        patcher = mock.patch.object(Regions, "SEGMENT_EVENTS", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().world_setup(*args, **kwargs)
+
+    def test_segment_events_created(self) -> None:
+        self.assertTrue(layout_key(self.world.options).segment_events)
+        self.assertTrue(any(location.address is None and location.name != "A New Future"
+                            for location in self.world.haste_locations.values()))
+
+    def test_same_gating_as_shard_regions(self) -> None:
+        """Segment events reach exactly the locations the plain per-Shard layout does for every inventory."""
+        key = layout_key(self.world.options)
+        with_events = HasteReachability(self.world.haste_rules, key)
+        without = HasteReachability(self.world.haste_rules, key._replace(segment_events=False))
+        items = [item.name for item in self.multiworld.itempool if item.player == self.player and item.advancement]
+        for _ in range(self.inventories):
+            inventory: dict[str, int] = {}
+            for name in self.multiworld.random.sample(items, self.multiworld.random.randrange(len(items) + 1)):
+                inventory[name] = inventory.get(name, 0) + 1
+            self.assertEqual(set(with_events.reachable(inventory)), set(without.reachable(inventory)))
+
+
+class TestReachabilityVanillaFashion(TestReachabilityDefault):
+    options = {
+        "shard_goal": 6,
+        "remove_post_victory_locations": True,
+        "shopsanity": "global",
+        "weeboh_purchases": "vanilla_plus",
+        "npc_shuffle": True,
+        "starting_ability": "wraiths_hourglass",
+    }
+
+
+class TestShardChainSpheres(HasteTestBase):
+    def test_shard_chain_spheres(self) -> None:
+        """A Progressive Shard on each of the first two bosses opens one more Shard per sphere."""
+        placements = {"Shard 1 Boss": "Progressive Shard", "Shard 2 Boss": "Progressive Shard"}
+        spheres = HasteReachability.for_world(self.world).spheres(placements)
+        self.assertEqual(len(spheres), 3)
+        self.assertIn("Shard 1 Boss", spheres[0])
+        self.assertIn("Shard 2 Boss", spheres[1])
+        self.assertIn("Shard 3 Boss", spheres[2])
+        reached = {name for sphere in spheres for name in sphere}
+        self.assertEqual(reached, set(HasteReachability.for_world(self.world).reachable({"Progressive Shard": 2})))
+        self.assertNotIn("Shard 4 Boss", reached)
+
+
+class TestIncrementalRegionReachability(HasteTestBase):
+    options = {
+        "shopsanity": "per_shard",
+        "pershard_shopsanity_quantity": 25,
+        "fragmentsanity": "per_shard",
+        "pershard_fragmentsanity_quantity": 25,
+        "npc_shuffle": True,
+        "speed_upgrade": True,
+        "starting_ability": "none",
+    }
+
+    def test_collected_one_at_a_time(self) -> None:
+        """With explicit indirect conditions, a state grown item by item reaches the same regions as a fresh one."""
+        self.assertTrue(self.world.explicit_indirect_conditions)
+        regions = [region for region in self.multiworld.regions if region.player == self.player]
+        items = [item for item in self.multiworld.itempool if item.player == self.player and item.advancement]
+        self.multiworld.random.shuffle(items)
+        incremental = CollectionState(self.multiworld)
+        for count, item in enumerate(items, 1):
+            incremental.collect(item, True)
+            fresh = CollectionState(self.multiworld)
+            for collected in items[:count]:
+                fresh.collect(collected, True)
+            with self.subTest(collected=count):
+                self.assertEqual(
+                    {region.name for region in regions if region.can_reach(incremental)},
+                    {region.name for region in regions if region.can_reach(fresh)},
+                )
@@ -0,0 +1,152 @@
+from BaseClasses import CollectionState, Entrance, Location
+from ..Locations import LOCATION_TABLE
+from ..Regions import layout_key, region_layout
+from ..rule_table import HasteRequirement, export_rule_table
+from . import HasteTestBase
+
+
+class TestRulesDefault(HasteTestBase):
+    # (entrance or location, items that reach it)
+    accessible = (
+        ("Shard 1 Entrance", ()),
+        ("Shard 2 Entrance", ("Progressive Shard",)),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 4),
+        ("Shard 3 Boss", ("Progressive Shard",) * 2),
+        ("Shard 10 Boss", ("Progressive Shard",) * 9),
+    )
+    # (entrance or location, items that don't reach it)
+    inaccessible = (
+        ("Shard 2 Entrance", ()),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 3),
+        ("Shard 10 Boss", ("Progressive Shard",) * 8),
+    )
+
+    def state_with(self, items: tuple[str, ...]) -> CollectionState:
+        state = CollectionState(self.multiworld)
+        for name in items:
+            state.collect(self.world.create_item(name), True)
+        return state
+
+    def can_reach(self, name: str, items: tuple[str, ...]) -> bool:
+        state = self.state_with(items)
+        if name.endswith(" Entrance"):
+            return self.multiworld.get_entrance(name, self.player).can_reach(state)
+        return self.multiworld.get_location(name, self.player).can_reach(state)
+
+    def test_accessible(self) -> None:
+        for name, items in self.accessible:
+            with self.subTest(name, items=items):
+                self.assertTrue(self.can_reach(name, items))
+
+    def test_inaccessible(self) -> None:
+        for name, items in self.inaccessible:
+            with self.subTest(name, items=items):
+                self.assertFalse(self.can_reach(name, items))
+
+    def test_export_matches_rules(self) -> None:
+        """Every location is reached with exactly what the tracker export says it needs, and not with one item less."""
+        exported = export_rule_table(self.world.options)
+        self.assertEqual(
+            set(exported["locations"]),
+            {name for name, location in self.world.haste_locations.items() if location.address is not None},
+        )
+        for name, rule in exported["locations"].items():
+            needs = dict(rule["all"])
+            any_of = list(rule["any"])
+            if rule["shard"] is not None:
+                shard = exported["shards"][rule["shard"]]
+                for item, count in shard["all"].items():
+                    needs[item] = max(needs.get(item, 0), count)
+                any_of = any_of or shard["any"]
+            items = tuple(item for item, count in needs.items() for _ in range(count))
+            with self.subTest(name, needs=needs, any_of=any_of):
+                self.assertTrue(self.can_reach(name, items + tuple(any_of[:1])))
+                for item in needs:
+                    fewer = list(items)
+                    fewer.remove(item)
+                    self.assertFalse(self.can_reach(name, tuple(fewer) + tuple(any_of[:1])))
+                if any_of:
+                    self.assertFalse(self.can_reach(name, items))
+
+    def test_entrance_rules_compiled(self) -> None:
+        """Each entrance gets the one rule compiled for its requirement, with option checks already folded away."""
+        options = self.world.options
+        rules = self.world.haste_rules
+        for layout_region in region_layout(layout_key(options)):
+            if layout_region.unlock is not None:
+                continue
+            requirement = rules.shard_requirement(layout_region.shard)
+            rule = self.multiworld.get_entrance(layout_region.entrance, self.player).access_rule
+            with self.subTest(layout_region.entrance, requirement=requirement):
+                self.assertIs(rule, rules.compile(requirement) or Entrance.access_rule)
+                if not options.speed_upgrade:
+                    self.assertNotIn("Progressive Speed Upgrade", dict(requirement.counts))
+                if options.starting_ability != options.starting_ability.option_none:
+                    self.assertFalse(requirement.any_of)
+        self.assertIs(self.multiworld.get_entrance("Shard 1 Entrance", self.player).access_rule, Entrance.access_rule)
+
+    def test_location_rules_shared(self) -> None:
+        """Locations with the same requirement share one rule object, and always-met ones keep the default rule."""
+        rules = self.world.haste_rules
+        by_requirement: dict[HasteRequirement, object] = {}
+        for name, location in self.world.haste_locations.items():
+            if location.address is None:
+                continue
+            requirement = rules.location_requirement(name, LOCATION_TABLE[name])
+            with self.subTest(name, requirement=requirement):
+                if requirement.counts or requirement.any_of:
+                    self.assertIs(location.access_rule, by_requirement.setdefault(requirement, location.access_rule))
+                    self.assertIsNot(location.access_rule, Location.access_rule)
+                else:
+                    self.assertIs(location.access_rule, Location.access_rule)
+        self.assertLess(len(by_requirement), len(self.world.haste_locations))
+
+
+class TestRulesSpeedNoAbility(TestRulesDefault):
+    options = {
+        "shopsanity": "global",
+        "fragmentsanity": "per_shard",
+        "speed_upgrade": True,
+        "npc_shuffle": True,
+        "starting_ability": "none",
+    }
+    accessible = (
+        ("Shard 3 Entrance", ("Progressive Shard",) * 2 + ("Progressive Speed Upgrade",)),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 4 + ("Progressive Speed Upgrade",) * 2 + ("Heir's Javelin",)),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 4 + ("Progressive Speed Upgrade",) * 2 + ("Sage's Cowl",)),
+        ("Wraith's Hourglass Purchase", ("Progressive Shard", "Wraith")),
+        ("Sage's Cowl Purchase", ("Progressive Shard", "Daro")),
+    )
+    inaccessible = (
+        ("Shard 3 Entrance", ("Progressive Shard",) * 2),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 4 + ("Progressive Speed Upgrade",) * 2),
+        ("Shard 5 Entrance", ("Progressive Shard",) * 4 + ("Progressive Speed Upgrade",) + ("Heir's Javelin",)),
+        ("Wraith's Hourglass Purchase", ("Progressive Shard",)),
+        ("Wraith's Hourglass Purchase", ("Wraith",)),
+    )
+
+
+class TestRulesVanillaFashion(TestRulesDefault):
+    options = {
+        "shopsanity": "off",
+        "fragmentsanity": "global",
+        "npc_shuffle": True,
+        "captains_upgrades": True,
+        "weeboh_purchases": "vanilla",
+        "starting_ability": "wraiths_hourglass",
+    }
+    accessible = (
+        ("Costume Purchase: Zoe the Shadow", ("Progressive Shard", "Fashion Weeboh")),
+        ("Costume Purchase: Weeboh", ("Progressive Shard",) * 4 + ("Fashion Weeboh",)),
+        (
+            "Costume Purchase: Totally Accurate Zoe",
+            ("Progressive Shard", "Fashion Weeboh", "Sage's Cowl", "Heir's Javelin"),
+        ),
+        ("Captain's Max Health Upgrade Purchase 1", ("Progressive Shard", "The Captain")),
+    )
+    inaccessible = (
+        ("Costume Purchase: Zoe the Shadow", ("Progressive Shard",)),
+        ("Costume Purchase: Weeboh", ("Progressive Shard",) * 3 + ("Fashion Weeboh",)),
+        ("Costume Purchase: Totally Accurate Zoe", ("Progressive Shard", "Fashion Weeboh", "Sage's Cowl")),
+        ("Captain's Max Health Upgrade Purchase 1", ("Progressive Shard",)),
+    )
@@ -0,0 +1,54 @@
+from ..slot_data import (
+    COMPACT_SLOT_DATA,
+    LEGACY_ALIASES,
+    SLOT_DATA_FIELDS,
+    SLOT_DATA_VERSION,
+    compact_slot_data,
+    legacy_slot_data,
+    read_slot_data,
+    slot_data_values,
+)
+from . import HasteTestBase
+
+
+class TestSlotData(HasteTestBase):
+    options = {
+        "shopsanity": "global",
+        "fragmentsanity": "per_shard",
+        "npc_shuffle": True,
+        "starting_ability": "sages_cowl",
+    }
+
+    def test_round_trip(self) -> None:
+        """Every format this world writes reads back to the same values."""
+        values = slot_data_values(self.world)
+        self.assertEqual(set(values), {field.name for field in SLOT_DATA_FIELDS})
+        self.assertEqual(read_slot_data(self.world.fill_slot_data()), values)
+        self.assertEqual(read_slot_data(compact_slot_data(values)), values)
+        self.assertEqual(read_slot_data(legacy_slot_data(values)), values)
+
+    def test_unversioned_slot_data(self) -> None:
+        """Slot data from before the format was versioned, with only the misspelt post-victory key, still reads."""
+        values = slot_data_values(self.world)
+        slot_data = legacy_slot_data(values)
+        for key in LEGACY_ALIASES:
+            del slot_data[key]
+        self.assertEqual(read_slot_data(slot_data), values)
+
+    def test_sent_keys(self) -> None:
+        """Until COMPACT_SLOT_DATA is on, every long key released mod builds read is sent, misspelt one included."""
+        slot_data = self.world.fill_slot_data()
+        if COMPACT_SLOT_DATA:
+            self.assertEqual(slot_data["v"], SLOT_DATA_VERSION)
+            return
+        self.assertNotIn("v", slot_data)
+        for field in SLOT_DATA_FIELDS:
+            self.assertIn(field.legacy_key, slot_data)
+        for alias in LEGACY_ALIASES.values():
+            self.assertIn(alias, slot_data)
+
+    def test_newer_version_rejected(self) -> None:
+        slot_data = compact_slot_data(slot_data_values(self.world))
+        slot_data["v"] = SLOT_DATA_VERSION + 1
+        with self.assertRaises(ValueError):
+            read_slot_data(slot_data)